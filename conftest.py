@@ -0,0 +1,2 @@
+# lets a bare `pytest` from the repo root import genfx: pytest puts the
+# directory of this file on sys.path
@@ -1,67 +1,16 @@
-import math, random
-
-import pyglet
-from pyglet.gl import *
-from particle import *
+from genfx import viewer
+from genfx.governor import Governor
+from genfx.scenes import FireworksScene
+from genfx.simulation import Simulation
 
 #-drawing-constants---------------------------------------------------------------
 WIDTH, HEIGHT, WINDOW_FS = 800, 600, False
 TARGET_FPS = 24
-# more constants here
-
-if WINDOW_FS:
-    win = pyglet.window.Window(fullscreen=True)
-    WIDTH, HEIGHT = 1920, 1080
-else:
-    win = pyglet.window.Window(WIDTH, HEIGHT)
-
-# enable transparency
-glEnable(GL_BLEND)
-glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-#-simulation-constants------------------------------------------------------------
 MAX_PARTICLES = 100000
-DELTA_T = 1/TARGET_FPS
-# more constants here
-
-#-main-update-function------------------------------------------------------------
-# spawn initial particle system
-systems = []
-
-# main loop driving simulation (set on timer)
-frameNum = 0
-
-def mainLoop(dt):
-    global systems, frameNum
-    # update particle system
-    particles = []
-    for index, sys in reversed(list(enumerate(systems))):
-        sys.update(DELTA_T)
-        if sys.alive:
-            particles += sys.children
-        else:
-            del systems[index]
-    # particles updated by parents
-
-    # draw pixels -> may be able to remove one loop with reordering and optimisation
-    win.clear()
-    glBegin(GL_POINTS)
-    for pp in particles:
-        glColor4f(pp.col[0], pp.col[1], pp.col[2], pp.col[3])
-        glVertex3f(pp.pos[0], pp.pos[1], pp.pos[2])
-        # print(pp.pos[0], pp.pos[1], pp.pos[2])
-    glEnd()
-
-    frameNum += 1
-    # frame.saveFrame(frameNum)? for making smooth video later
-    print( "Frame %3d: %6d particles, %3d systems, %4d ms (%2d FPS)" % (frameNum, len(particles), len(systems), dt, 1/dt) )
-    return None
+STEP_BUDGET = None # e.g. 0.5/TARGET_FPS to throttle spawning while a step takes longer (runs are then not reproducible)
+PIPELINED = False # simulate the next frame on a worker thread while drawing
 
 #-run-simluation------------------------------------------------------------------
-def spawnParticle(t):
-    # xpos = random.uniform(0, WIDTH/2)
-    systems.append( ParticleSystem([WIDTH/2, HEIGHT/2, 0], [0.2, 0.9, 0.1, 0.9], [0.0, 0.2, 1.0, 0.3]) )
-
-pyglet.clock.schedule_interval(mainLoop, 1/TARGET_FPS)
-pyglet.clock.schedule_interval(spawnParticle, 2)
-pyglet.app.run()
+if __name__ == "__main__":
+    sim = Simulation(FireworksScene(WIDTH, HEIGHT), dt=1/TARGET_FPS, governor=Governor(MAX_PARTICLES, STEP_BUDGET))
+    viewer.run(sim, fullscreen=WINDOW_FS, width=WIDTH, height=HEIGHT, fps=TARGET_FPS, pipelined=PIPELINED)
@@ -0,0 +1,4 @@
+from genfx.engine import ParticleEngine, ParticleBuffer, SurfaceSystem, FireworkSystem
+from genfx.simulation import Simulation
+from genfx.scenes import GenesisScene, ExplosionScene, FireworksScene
+from genfx.camera import Camera
@@ -0,0 +1,267 @@
+import argparse, json, platform, statistics, sys, time
+
+import numpy as np
+
+from genfx import engine, kernels, lod, mesh
+from genfx.camera import Camera
+from genfx.engine import ParticleBuffer, SurfaceSystem, RADIUS
+from genfx.gldraw import pack
+from genfx.gradient import GRADIENTS, FIRE, Gradient
+from genfx.raster import sphereTriangles
+from genfx.scenes import GenesisScene, ExplosionScene
+from genfx.simulation import Simulation, DELTA_T
+from genfx.streams import Stream
+
+# Headless benchmark suite
+#   python -m genfx.bench --out bench.json
+#   times the per-object code in genparts.py (when run from the repository
+#   root) next to the genfx engine, and writes every result as JSON so runs
+#   of different versions can be compared
+
+#-constants-----------------------------------------------------------------------
+SIZES = (1000, 10000, 100000, 1000000)
+LEGACY_MAX = 100000 # one Python object per particle gets too big past this
+EMITTERS = 500
+DEPTHS = (3, 4, 5, 6, 7)
+REPLAY_FRAMES = 240
+LOD_CELLS = (1, 2, 4) # pixels
+LOD_FRAME = 300 # a crowded genesis frame
+REPEAT = 5
+
+#-harness-------------------------------------------------------------------------
+# time fn() 'repeat' times after one warm-up call
+#   setup() (if given) runs before every call and is not timed
+def measure(fn, repeat=REPEAT, setup=None):
+    times = []
+    for ii in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        if ii:
+            times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "repeat": repeat}
+
+# one JSON record; 'items' is what the time is per (particles, emitters, ...)
+def record(name, timing, items=None, **params):
+    result = {"name": name, "params": params, "seconds": timing["median"], "min_seconds": timing["min"], "repeat": timing["repeat"]}
+    if items:
+        result["items"] = items
+        result["per_item_ns"] = 1e9*timing["median"]/items
+        result["items_per_second"] = items/timing["median"]
+    return result
+
+#-fixtures------------------------------------------------------------------------
+# n particles well outside the planet with lifespans that never run out, so
+# repeated updates keep timing the same number of particles
+def particleBuffer(n):
+    rng = np.random.default_rng(0)
+    buf = ParticleBuffer(n)
+    normal = rng.normal(size=(n, 3))
+    normal /= np.linalg.norm(normal, axis=1)[:, None]
+    buf.add(1000*normal, 15*normal, engine.GRAVITY*normal, GRADIENTS.id(Gradient.ramp([1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1])), 0, 1e9)
+    return buf
+
+def surfaceSystems(n, seed=0):
+    rng = np.random.default_rng(seed)
+    normal = rng.normal(size=(n, 3))
+    normal /= np.linalg.norm(normal, axis=1)[:, None]
+    systems = SurfaceSystem.many(RADIUS*normal, [1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1], 2.0)
+    for ii, system in enumerate(systems):
+        system.id, system.rng = ii, Stream(seed, ii)
+    return systems
+
+def legacyModule():
+    try:
+        import genparts
+    except ImportError:
+        return None
+    return genparts
+
+#-benchmarks----------------------------------------------------------------------
+def benchUpdate(sizes, legacyMax):
+    results = []
+    genparts = legacyModule()
+    for n in sizes:
+        buf = particleBuffer(n)
+        results.append(record("engine.ParticleBuffer.update", measure(lambda: buf.update(DELTA_T, RADIUS)), n, particles=n))
+
+        if genparts is None or n > legacyMax:
+            continue
+        rng = np.random.default_rng(0)
+        normal = rng.normal(size=(n, 3))
+        normal /= np.linalg.norm(normal, axis=1)[:, None]
+        children = [genparts.Particle((1000*p).tolist(), (15*p).tolist(), (genparts.GRAVITY*p).tolist(), [1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1], 1e9) for p in normal]
+        def updateAll():
+            for child in children:
+                child.update(DELTA_T)
+        results.append(record("genparts.Particle.update", measure(updateAll, repeat=max(1, min(REPEAT, 100000//n))), n, particles=n))
+
+        system = genparts.ParticleSystem([RADIUS, 0, 0], [1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1], lifespan=1e9)
+        system.children, system.canSpawn = children, False
+        results.append(record("genparts.ParticleSystem.update", measure(lambda: system.update(DELTA_T), repeat=max(1, min(REPEAT, 100000//n))), n, particles=n))
+    return results
+
+def benchSpawn(emitters):
+    results = []
+    systems = surfaceSystems(emitters)
+    buf = ParticleBuffer(emitters*engine.P_CHILDREN)
+    def reset():
+        buf.count = 0
+    results.append(record("engine.SurfaceSystem.spawnBatch", measure(lambda: SurfaceSystem.spawnBatch(systems, buf), setup=reset), emitters, emitters=emitters))
+    def spawnEach():
+        for system in systems:
+            system.spawn(buf)
+    results.append(record("engine.SurfaceSystem.spawn", measure(spawnEach, setup=reset), emitters, emitters=emitters))
+
+    genparts = legacyModule()
+    if genparts is not None:
+        legacy = [genparts.ParticleSystem(system.pos.tolist(), [1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1]) for system in systems]
+        def reset():
+            for system in legacy:
+                system.children = []
+        def spawnLegacy():
+            for system in legacy:
+                system.spawn()
+        results.append(record("genparts.ParticleSystem.spawn", measure(spawnLegacy, setup=reset), emitters, emitters=emitters))
+    return results
+
+def benchMesh(depths):
+    results = []
+    for depth in depths:
+        def build():
+            mesh._meshes.clear()
+            mesh.sphere(RADIUS, depth, cache=False)
+        results.append(record("mesh.sphere", measure(build, repeat=3), 4**depth*8, depth=depth, cached=False))
+        mesh.sphere(RADIUS, depth)
+        def load():
+            mesh._meshes.clear()
+            mesh.sphere(RADIUS, depth)
+        results.append(record("mesh.sphere", measure(load, repeat=3), 4**depth*8, depth=depth, cached=True))
+    return results
+
+def benchColor(sizes, legacyMax):
+    results = []
+    genparts = legacyModule()
+    colS, colF = np.array([1.0, 0.5, 0.05, 0.95]), np.array([1.0, 0.0, 0.1, 0.1])
+    for n in sizes:
+        ages = np.linspace(0, 1, n)[:, None]
+        results.append(record("engine.colorInterp", measure(lambda: engine.colorInterp(colS, colF, ages, 1.0)), n, colors=n))
+        grad, phase, frac = np.full(n, GRADIENTS.id(FIRE)), np.zeros(n, dtype=np.float32), ages.ravel().astype(np.float32)
+        out = np.empty((n, 4), dtype=np.float32)
+        results.append(record("gradient.GradientTable.colors", measure(lambda: GRADIENTS.colors(grad, phase, frac, out)), n, colors=n))
+        if genparts is not None and n <= legacyMax:
+            agesList = ages.ravel().tolist()
+            def interp():
+                for age in agesList:
+                    genparts.colorInterp([1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1], age, 1.0)
+            results.append(record("genparts.colorInterp", measure(interp, repeat=max(1, min(REPEAT, 100000//n))), n, colors=n))
+    return results
+
+def benchDrawPrep(sizes):
+    results = []
+    for n in sizes:
+        buf = particleBuffer(n)
+        out = np.empty((n, 7), dtype=np.float32)
+        results.append(record("gldraw.pack", measure(lambda: pack(buf.pos[:n], buf.col[:n], out)), n, particles=n))
+    return results
+
+# the fused loops of genfx.kernels next to the NumPy update they replace,
+# plus kernels.check() (without Numba only the check runs, in Python)
+def benchKernels(sizes):
+    results = []
+    result = {"name": "kernels.check", "params": {"numba": kernels.ENABLED}}
+    try:
+        result["max_difference"] = kernels.check()
+    except AssertionError as e:
+        result["error"] = str(e)
+        print("kernels disagree with the NumPy code: %s" % e, file=sys.stderr)
+    results.append(result)
+    if not kernels.ENABLED:
+        return results
+    for n in sizes:
+        for jit in (False, True):
+            buf = particleBuffer(n)
+            buf.jit = jit
+            results.append(record("engine.ParticleBuffer.update", measure(lambda: buf.update(DELTA_T, RADIUS)), n, particles=n, jit=jit))
+    return results
+
+# level of detail merging on a genesis frame seen by the scripts' camera at
+# 1080p: time per reduce() and how far the merged frame is from the full one
+def benchLod(cells):
+    sim = Simulation(GenesisScene(), seed=0)
+    sim.step(LOD_FRAME)
+    rows = pack(sim.positions(), sim.colors())
+    camera = Camera([0, 0, -100], 60, (0.0, 1.0, 0.1))
+    triangles = sphereTriangles(sim.scene.radius, 4)
+    results = []
+    for size in cells:
+        reducer = lod.LevelOfDetail(camera, 1920, 1080, size)
+        result = record("lod.LevelOfDetail.reduce", measure(lambda: reducer.reduce(rows)), len(rows), particles=len(rows), cell_size=size)
+        diff = lod.error(rows[:, :3], rows[:, 3:], camera, 1920, 1080, size, triangles=triangles)
+        result.update({"drawn": diff["drawn"], "merged_ratio": diff["ratio"], "difference": {k: diff[k] for k in ("mean", "p99", "max", "pixel_mean")}})
+        if diff["mean"] > lod.MAX_ERROR[0] or diff["p99"] > lod.MAX_ERROR[1]:
+            print("merging %d pixel cells changed the frame more than lod.MAX_ERROR: %r" % (size, diff), file=sys.stderr)
+        results.append(result)
+    return results
+
+# replay a fixed number of frames of each scene's spawn schedule
+def benchReplay(frames):
+    results = []
+    for name, scene in (("genesis", GenesisScene), ("explosion", ExplosionScene)):
+        sim = Simulation(scene(), seed=0)
+        frameTimes, counts = [], []
+        for ii in range(frames):
+            start = time.perf_counter()
+            sim.step()
+            frameTimes.append(time.perf_counter() - start)
+            counts.append(len(sim.engine.particles))
+        timing = {"median": statistics.median(frameTimes), "min": min(frameTimes), "repeat": frames}
+        result = record("simulation.replay", timing, scene=name, frames=frames)
+        result.update({"total_seconds": sum(frameTimes), "max_seconds": max(frameTimes),
+                       "peak_particles": max(counts), "mean_particles": statistics.mean(counts)})
+        results.append(result)
+    return results
+
+#-command-line--------------------------------------------------------------------
+SUITES = {"update": lambda a: benchUpdate(a.sizes, a.legacy_max),
+          "spawn": lambda a: benchSpawn(a.emitters),
+          "mesh": lambda a: benchMesh(a.depths),
+          "color": lambda a: benchColor(a.sizes, a.legacy_max),
+          "drawprep": lambda a: benchDrawPrep(a.sizes),
+          "kernels": lambda a: benchKernels(a.sizes),
+          "lod": lambda a: benchLod(a.lod_cells),
+          "replay": lambda a: benchReplay(a.frames)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m genfx.bench", description="Time the particle engine headless and write JSON results.")
+    parser.add_argument("suites", nargs="*", metavar="SUITE", help="any of %s (default: all)" % ", ".join(sorted(SUITES)))
+    parser.add_argument("--out", default=None, help="JSON file to write (default: stdout)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--legacy-max", type=int, default=LEGACY_MAX, help="largest size to time the per-object code at")
+    parser.add_argument("--emitters", type=int, default=EMITTERS)
+    parser.add_argument("--depths", type=int, nargs="+", default=DEPTHS)
+    parser.add_argument("--frames", type=int, default=REPLAY_FRAMES)
+    parser.add_argument("--lod-cells", type=int, nargs="+", default=LOD_CELLS, help="level of detail cell sizes in pixels")
+    args = parser.parse_args(argv)
+    for name in args.suites:
+        if name not in SUITES:
+            parser.error("unknown suite %r" % name)
+
+    results = []
+    for name in args.suites or sorted(SUITES):
+        print("running %s..." % name, file=sys.stderr)
+        results += SUITES[name](args)
+
+    report = {"meta": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                       "machine": platform.machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+              "results": results}
+    text = json.dumps(report, indent=1)
+    if args.out is None:
+        print(text)
+    else:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+
+#-camera--------------------------------------------------------------------------
+# Fixed camera used by the genesis/explosion views
+#   equivalent to gluPerspective(fov, aspect, near, far) followed by
+#   glTranslatef(*pos) and glRotatef(rot_deg, *rot_axis)
+class Camera:
+    def __init__(self, pos=(0, 0, -100), rot_deg=60, rot_axis=(0.0, 1.0, 0.1), fov=90, near=0.1, far=100):
+        self.pos = list(pos)
+        self.rot_deg = rot_deg
+        self.rot_axis = tuple(rot_axis)
+        self.fov = fov
+        self.near, self.far = near, far
+
+    # hashable summary of everything that affects the matrices
+    def key(self):
+        return (tuple(self.pos), self.rot_deg, self.rot_axis, self.fov, self.near, self.far)
+
+    # GL_PROJECTION matrix (column vector convention, as in the GL docs)
+    def projection(self, aspect):
+        f = 1/math.tan(math.radians(self.fov)/2)
+        near, far = self.near, self.far
+        return np.array([[f/aspect, 0, 0, 0],
+                         [0, f, 0, 0],
+                         [0, 0, (far+near)/(near-far), 2*far*near/(near-far)],
+                         [0, 0, -1, 0]])
+
+    # GL_MODELVIEW matrix
+    def modelview(self):
+        x, y, z = np.asarray(self.rot_axis, dtype=float) / np.linalg.norm(self.rot_axis)
+        c, s = math.cos(math.radians(self.rot_deg)), math.sin(math.radians(self.rot_deg))
+        rot = np.array([[x*x*(1-c)+c,   x*y*(1-c)-z*s, x*z*(1-c)+y*s, 0],
+                        [y*x*(1-c)+z*s, y*y*(1-c)+c,   y*z*(1-c)-x*s, 0],
+                        [x*z*(1-c)-y*s, y*z*(1-c)+x*s, z*z*(1-c)+c,   0],
+                        [0, 0, 0, 1]])
+        trans = np.eye(4)
+        trans[:3, 3] = self.pos
+        return trans @ rot
+
+    # combined projection @ modelview
+    def matrix(self, aspect):
+        return self.projection(aspect) @ self.modelview()
+
+# pyglet's default 2D projection: glOrtho(0, width, 0, height, -1, 1) with an
+# identity modelview, as used by fireworks.py
+class PixelCamera:
+    def __init__(self, width=800, height=600):
+        self.width, self.height = width, height
+
+    def key(self):
+        return (self.width, self.height)
+
+    def matrix(self, aspect=None):
+        w, h = self.width, self.height
+        return np.array([[2/w, 0, 0, -1],
+                         [0, 2/h, 0, -1],
+                         [0, 0, -1, 0],
+                         [0, 0, 0, 1]])
@@ -0,0 +1,204 @@
+import numpy as np
+
+from genfx.engine import DTYPE, EmitterRegistry, ParticleBuffer, ParticleEngine
+
+# Closed-form particle evaluation
+#   every particle moves under a constant acceleration and takes its color
+#   from a gradient at a point that only depends on its age, so after k steps
+#   of the engine's integration (velocity first, then position) it is at
+#       v_k = v0 + k*dt*a
+#       p_k = p0 + k*dt*v0 + dt^2*k(k+1)/2*a
+#   Trajectories keeps the birth step and initial state of every particle
+#   alive somewhere in a frame range and evaluates any frame of that range
+#   directly, in O(live particles). The emitters are rebuilt from the spawn
+#   events that created them (their random streams are keyed on the event,
+#   see genfx.streams), with each stream's counter moved to where the stepped
+#   run would have it, so the particles are born exactly as they would be.
+#
+#   ages, lifetimes and birth/death steps match a stepped Simulation exactly;
+#   positions and velocities agree to float32 rounding (Euler accumulates its
+#   own rounding), so a particle grazing the planet's kill radius may in rare
+#   cases live a step more or less than it does in a stepped run.
+#
+#   frame f is the state after f steps, i.e. Simulation.frameNum == f
+
+#-trajectories--------------------------------------------------------------------
+# initial states of particles (a ParticleBuffer holding them as spawned) with
+# the step each was born in and the step it is killed in
+class Trajectories:
+    def __init__(self, spawned, birth, death, dt, start, stop):
+        n = len(spawned)
+        self.pos0, self.vel0, self.acc = (getattr(spawned, name)[:n].astype(float) for name in ("pos", "vel", "acc"))
+        self.grad, self.phase = spawned.grad[:n].copy(), spawned.phase[:n].copy()
+        self.lifespan, self.owner = spawned.lifespan[:n].copy(), spawned.owner[:n].copy()
+        self.birth, self.death = birth, death
+        self.dt = dt
+        self.start, self.stop = start, stop # frames this was built for
+        self.ages = particleAges(dt, int((death - birth).max(initial=0)) + 1)
+
+    def __len__(self):
+        return len(self.birth)
+
+    # indices of the particles alive at 'frame', in the order the engine keeps them
+    def alive(self, frame):
+        if not self.start <= frame < self.stop:
+            raise ValueError("frame %d outside [%d, %d)" % (frame, self.start, self.stop))
+        return np.flatnonzero((self.birth <= frame) & (frame < self.death))
+
+    # (pos, vel, col, age) float32 arrays of particles 'idx' at 'frame'
+    def evaluate(self, frame, idx):
+        k = frame - self.birth[idx]
+        t = (k*self.dt)[:, None]
+        a = self.acc[idx]
+        pos = self.pos0[idx] + t*self.vel0[idx] + (self.dt*t*(k+1)[:, None]/2)*a
+        vel = self.vel0[idx] + t*a
+        age = self.ages[k]
+        # same float32 lookup as ParticleBuffer.advance
+        col = ParticleBuffer.gradients.colors(self.grad[idx], self.phase[idx], age/self.lifespan[idx])
+        return pos.astype(DTYPE), vel.astype(DTYPE), col, age
+
+    def positions(self, frame):
+        return self.evaluate(frame, self.alive(frame))[0]
+
+    def colors(self, frame):
+        return self.evaluate(frame, self.alive(frame))[2]
+
+    # replace the contents of 'particles' (a ParticleBuffer) with the
+    # particles alive at 'frame'
+    def fill(self, particles, frame):
+        idx = self.alive(frame)
+        pos, vel, col, age = self.evaluate(frame, idx)
+        particles.count = 0
+        particles.add(pos, vel, self.acc[idx], self.grad[idx], self.phase[idx], self.lifespan[idx], self.owner[idx])
+        n = len(idx)
+        particles.col[:n], particles.age[:n] = col, age
+        return particles
+
+#-reconstruction------------------------------------------------------------------
+# the emitters of 'sim's scene that can be alive during frames [start, stop)
+#   returns [(system, created, removed)]: each system is rebuilt from its
+#   spawn event, is first updated in step 'created' and is removed at the
+#   end of step 'removed'. Ids are numbered from 0 in creation order.
+def emitters(sim, start, stop):
+    scene = sim.scene
+    clocks = engineClock(sim.dt, stop + sim.warmup() + 1)
+    found = []
+    # one engine for every event, so a FileScene walks its schedule once
+    engine = ParticleEngine(scene.radius)
+    for k in range(sim.eventsBefore(max(0, start - sim.warmup())), sim.eventsBefore(stop - 1)):
+        engine.systems, engine.rng = [], sim.stream.child("event", k)
+        scene.spawnParticle(engine, k)
+        created = sim.eventStep(k)
+        ages = systemAges(clocks, created, sim.warmup() + 1)
+        for sys in engine.systems:
+            lived = max(1, int(np.searchsorted(ages, sys.lifespan)))
+            if lived >= len(ages):
+                clocks = engineClock(sim.dt, created + 2*lived)
+                ages = systemAges(clocks, created, 2*lived)
+                lived = max(1, int(np.searchsorted(ages, sys.lifespan)))
+            sys.id = len(found)
+            found.append((sys, created, created + lived - 1))
+    return found
+
+# every particle alive at some frame in [start, stop) of 'sim's scene
+def trajectories(sim, start, stop, systems=None):
+    if systems is None:
+        systems = emitters(sim, start, stop)
+    dt = sim.dt
+    clocks = engineClock(dt, stop)
+    spawned = ParticleBuffer()
+    births = []
+    childAges = {}
+
+    # first step whose children can still be alive at 'start'
+    def firstBirth(sys):
+        kind = type(sys)
+        if kind not in childAges:
+            table = particleAges(dt, sim.warmup() + 1)
+            childAges[kind] = max(1, int(np.searchsorted(table, DTYPE(kind.CHILD_LIFESPAN))))
+        return start - childAges[kind] + 1
+
+    first = min((max(created, firstBirth(sys)) for sys, created, removed in systems), default=stop)
+    for birth in range(first, stop):
+        spawning = {}
+        for sys, created, removed in systems:
+            # children of the step a system dies in are removed along with it
+            if created <= birth < removed and (birth == created or not sys.SPAWNS_ONCE) and birth >= firstBirth(sys):
+                step = birth - created
+                sys.rng.counter = (0 if sys.SPAWNS_ONCE else step)*sys.DRAWS
+                sys.phase = (clocks[birth - 1] - clocks[created - 1])/sys.lifespan
+                spawning.setdefault(type(sys), []).append(sys)
+        before = len(spawned)
+        for kind, group in spawning.items():
+            kind.spawnBatch(group, spawned)
+        births.append(np.full(len(spawned) - before, birth, dtype=np.int64))
+
+    birth = np.concatenate(births) if births else np.zeros(0, dtype=np.int64)
+    death = deathSteps(spawned, birth, np.array([removed for sys, created, removed in systems], dtype=np.int64), dt, sim.scene.radius)
+    keep = (death > start) & (death > birth)
+    spawned.compact(keep)
+    return Trajectories(spawned, birth[keep], death[keep], dt, start, stop)
+
+# step each particle is killed in: the first of running out of life, ending up
+# inside the planet and its emitter being removed
+def deathSteps(spawned, birth, removed, dt, radius):
+    n = len(spawned)
+    lifespan = spawned.lifespan[:n]
+    ages = particleAges(dt, 2)
+    while ages[-1] < lifespan.max(initial=0):
+        ages = particleAges(dt, 2*len(ages))
+    lived = np.maximum(1, np.searchsorted(ages, lifespan))
+    death = np.minimum(birth + lived, removed[spawned.owner[:n]])
+    if radius is not None:
+        p0, v0, a = (getattr(spawned, name)[:n].astype(float) for name in ("pos", "vel", "acc"))
+        alive = np.ones(n, dtype=bool)
+        for k in range(1, int(lived.max(initial=0))):
+            alive &= k < lived
+            if not alive.any():
+                break
+            p = (p0 + (k*dt)*v0 + (dt*dt*k*(k+1)/2)*a).astype(DTYPE)
+            inside = alive & (p[:, 0]*p[:, 0] + p[:, 1]*p[:, 1] + p[:, 2]*p[:, 2] <= radius*radius)
+            death[inside] = np.minimum(death[inside], birth[inside] + k)
+            alive &= ~inside
+    return death
+
+#-seeking-------------------------------------------------------------------------
+# put 'sim' in the state it would be in after 'frame' steps, without stepping
+# through the frames before it
+def seek(sim, frame):
+    engine = sim.engine
+    systems = emitters(sim, frame, frame + 1)
+    traj = trajectories(sim, frame, frame + 1, systems)
+    clocks = engineClock(sim.dt, frame)
+
+    live = []
+    for sys, created, removed in systems:
+        if created <= frame < removed:
+            steps = frame - created + 1
+            sys.born = float(clocks[created - 1])
+            sys.age = clocks[frame] - sys.born
+            sys.phase = sys.age/sys.lifespan
+            sys.rng.counter = (1 if sys.SPAWNS_ONCE else steps)*sys.DRAWS
+            sys.canSpawn = not sys.SPAWNS_ONCE
+            sys.alive = True
+            live.append(sys)
+    engine.registry = EmitterRegistry(live, float(clocks[frame]))
+    engine.nextId = len(systems)
+    engine.particles = traj.fill(ParticleBuffer(), frame)
+    sim.frameNum = frame
+    sim.iteration = sim.eventsBefore(frame)
+    return sim
+
+#-helper/utility-functions--------------------------------------------------------
+# engine clock after 0..steps updates, summed the way the engine sums it
+def engineClock(dt, steps):
+    return np.concatenate([[0.0], np.cumsum(np.full(steps, dt))])
+
+# age of a system first updated in step 'created' after 0..steps updates,
+# taken from the engine clock the way the engine takes it
+def systemAges(clocks, created, steps):
+    return clocks[created - 1:created + steps] - clocks[created - 1]
+
+# particle ages after 0..steps updates, summed in float32 the way the engine sums them
+def particleAges(dt, steps):
+    return np.concatenate([np.zeros(1, dtype=DTYPE), np.cumsum(np.full(steps, dt, dtype=DTYPE))])
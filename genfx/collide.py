@@ -0,0 +1,171 @@
+import numpy as np
+
+from genfx import mesh
+
+# Particle collisions against an arbitrary triangle mesh
+#   the sphere planet keeps its squared-radius test (ParticleBuffer.advance);
+#   a deformed planet (a displaced icosphere, terrain, ...) is a triangle mesh
+#   instead, indexed by a uniform grid. Every step, each particle's motion is
+#   a segment from its old to its new position, and all segments are tested
+#   against the triangles of the grid cells their bounding boxes touch, in
+#   one batch of array operations.
+#
+#   a particle is killed when its segment crosses into the mesh or ends
+#   inside it, like the sphere rule kills by position. Crossings only count
+#   against the triangle normals, which are turned to face away from the mesh
+#   centre (right for any star-shaped planet); inside means an odd number of
+#   triangles crossed by a ray from the point along +x, which walks a single
+#   row of grid cells
+
+#-constants-----------------------------------------------------------------------
+MAX_CELLS = 1 << 21 # largest grid, in cells
+CHUNK = 1 << 20 # most (segment, triangle) pairs tested at once
+PARALLEL_EPS = 1e-12 # segments closer than this to a triangle's plane miss it
+RAY_SHIFT = (3.1415926e-7, 2.7182818e-7) # y, z nudge of inside() rays in cells, off mesh edges and vertices
+
+#-collider------------------------------------------------------------------------
+# MeshCollider(vertices, triangles) - uniform grid over a triangle mesh
+#   vertices  - (v, 3) array
+#   triangles - (t, 3) vertex indices, e.g. from genfx.mesh.sphere
+#   cellSize  - grid spacing (default: the mean triangle bounding box size)
+class MeshCollider:
+    def __init__(self, vertices, triangles, cellSize=None):
+        corners = np.asarray(vertices, dtype=float)[np.asarray(triangles)]
+        self.v0 = corners[:, 0]
+        self.e1 = corners[:, 1] - self.v0
+        self.e2 = corners[:, 2] - self.v0
+        # outward facing normals
+        self.normal = np.cross(self.e1, self.e2)
+        centre = corners.reshape(-1, 3).mean(axis=0)
+        flip = np.einsum("ij,ij->i", self.normal, corners.mean(axis=1) - centre) < 0
+        self.normal[flip] *= -1
+        self.offset = np.einsum("ij,ij->i", self.normal, self.v0) # plane: normal.p = offset
+
+        lo, hi = corners.min(axis=1), corners.max(axis=1)
+        self.origin = lo.min(axis=0)
+        extent = hi.max(axis=0) - self.origin
+        if cellSize is None:
+            cellSize = max((hi - lo).mean(), 1e-9)
+        cellSize = max(cellSize, (np.prod(extent + cellSize)/MAX_CELLS)**(1/3))
+        self.cellSize = cellSize
+        self.dims = np.maximum(1, np.ceil(extent/cellSize).astype(np.int64))
+
+        # every (cell, triangle) pair whose boxes overlap, sorted by cell
+        first, last = self.cellRange(lo, hi)
+        cells, owners = self.boxCells(first, last)
+        order = np.argsort(cells, kind="stable")
+        self.cellTris = owners[order]
+        self.cellStart = np.searchsorted(cells[order], np.arange(np.prod(self.dims) + 1))
+
+    def __len__(self):
+        return len(self.v0)
+
+    # grid cells (clamped to the grid) spanned by boxes [lo, hi]
+    def cellRange(self, lo, hi):
+        top = self.dims - 1
+        first = np.clip(np.floor((lo - self.origin)/self.cellSize), 0, top).astype(np.int64)
+        last = np.clip(np.floor((hi - self.origin)/self.cellSize), 0, top).astype(np.int64)
+        return first, last
+
+    # (cell index, box index) of every cell covered by each box [first, last]
+    def boxCells(self, first, last):
+        span = last - first + 1
+        counts = span.prod(axis=1)
+        box = np.repeat(np.arange(len(first)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        sx, sy = span[box, 0], span[box, 1]
+        ix = first[box, 0] + local % sx
+        iy = first[box, 1] + (local//sx) % sy
+        iz = first[box, 2] + local//(sx*sy)
+        return (iz*self.dims[1] + iy)*self.dims[0] + ix, box
+
+    # candidate (segment, triangle) pairs for segments p0 -> p1
+    def candidates(self, p0, p1):
+        lo, hi = np.minimum(p0, p1), np.maximum(p0, p1)
+        inside = np.all((hi >= self.origin) & (lo <= self.origin + self.dims*self.cellSize), axis=1)
+        idx = np.flatnonzero(inside)
+        first, last = self.cellRange(lo[idx], hi[idx])
+        cells, box = self.boxCells(first, last)
+        counts = self.cellStart[cells + 1] - self.cellStart[cells]
+        pairs = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        tri = self.cellTris[np.repeat(self.cellStart[cells], counts) + pairs]
+        return idx[np.repeat(box, counts)], tri
+
+    # first crossing into the mesh of each segment p0 -> p1 ((n, 3) arrays)
+    #   returns (t, triangle): the hit point is p0 + t*(p1 - p0), t is inf
+    #   and triangle -1 for segments that do not enter the mesh
+    def intersect(self, p0, p1):
+        p0, p1 = np.asarray(p0, dtype=float), np.asarray(p1, dtype=float)
+        n = len(p0)
+        tHit, triHit = np.full(n, np.inf), np.full(n, -1, dtype=np.int64)
+        seg, tri = self.candidates(p0, p1)
+        for s in range(0, len(seg), CHUNK):
+            t, ok = self.segmentTriangle(p0, p1, seg[s:s+CHUNK], tri[s:s+CHUNK])
+            segs, tris, t = seg[s:s+CHUNK][ok], tri[s:s+CHUNK][ok], t[ok]
+            np.minimum.at(tHit, segs, t)
+            first = t == tHit[segs]
+            triHit[segs[first]] = tris[first]
+        return tHit, triHit
+
+    # mask of the (n, 3) points inside the mesh
+    #   counts the triangles a ray from each point to past the end of the grid
+    #   crosses; each (ray, triangle) pair is counted once however many cells
+    #   they share. Points outside the grid's box are outside the mesh.
+    def inside(self, points):
+        points = np.asarray(points, dtype=float)
+        top = self.origin + self.dims*self.cellSize
+        result = np.zeros(len(points), dtype=bool)
+        idx = np.flatnonzero(np.all((points >= self.origin) & (points <= top), axis=1))
+        p0 = points[idx]
+        p0[:, 1:] += np.multiply(RAY_SHIFT, self.cellSize)
+        p1 = p0.copy()
+        p1[:, 0] = top[0] + self.cellSize
+        seg, tri = self.candidates(p0, p1)
+        crossed = []
+        for s in range(0, len(seg), CHUNK):
+            ok = self.segmentTriangle(p0, p1, seg[s:s+CHUNK], tri[s:s+CHUNK], entering=False)[1]
+            crossed.append(seg[s:s+CHUNK][ok]*len(self) + tri[s:s+CHUNK][ok])
+        pairs = np.unique(np.concatenate(crossed)) if crossed else np.zeros(0, dtype=np.int64)
+        result[idx] = np.bincount(pairs//len(self), minlength=len(idx)) % 2 == 1
+        return result
+
+    # mask of the segments p0 -> p1 that cross into the mesh or end inside it
+    def hits(self, p0, p1):
+        hit = np.isfinite(self.intersect(p0, p1)[0])
+        rest = np.flatnonzero(~hit)
+        hit[rest] = self.inside(np.asarray(p1, dtype=float)[rest])
+        return hit
+
+    # Moller-Trumbore test of segments 'seg' against triangles 'tri'
+    #   returns (t, hit mask), counting only crossings against the normal
+    #   unless 'entering' is False. Pairs whose segment does not go from one
+    #   side of the triangle's plane to the other (from the front to the back
+    #   when entering) are thrown out first, which is most of them.
+    def segmentTriangle(self, p0, p1, seg, tri, entering=True):
+        normal = self.normal[tri]
+        above0 = np.einsum("ij,ij->i", p0[seg], normal) > self.offset[tri]
+        above1 = np.einsum("ij,ij->i", p1[seg], normal) > self.offset[tri]
+        front = above0 & ~above1 if entering else above0 != above1
+        t, ok = np.zeros(len(seg)), np.zeros(len(seg), dtype=bool)
+        pick = np.flatnonzero(front)
+        seg, tri = seg[pick], tri[pick]
+
+        d = p1[seg] - p0[seg]
+        e1, e2 = self.e1[tri], self.e2[tri]
+        h = np.cross(d, e2)
+        a = np.einsum("ij,ij->i", e1, h)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f = 1/a
+            s = p0[seg] - self.v0[tri]
+            u = f*np.einsum("ij,ij->i", s, h)
+            q = np.cross(s, e1)
+            v = f*np.einsum("ij,ij->i", d, q)
+            t[pick] = f*np.einsum("ij,ij->i", e2, q)
+        ok[pick] = (np.abs(a) > PARALLEL_EPS) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t[pick] > 0) & (t[pick] <= 1)
+        return t, ok
+
+#-helper/utility-functions--------------------------------------------------------
+# collider for a sphere mesh of 'radius' (see genfx.mesh.sphere); mostly for
+# checking the mesh path against the squared-radius one
+def sphereCollider(radius, depth, base="icosahedron"):
+    return MeshCollider(*mesh.sphere(radius, depth, base))
@@ -0,0 +1,70 @@
+import numpy as np
+
+from genfx.gldraw import PACKED, pack
+
+# View culling before drawing
+#   every particle position goes through the camera's projection @ modelview
+#   in one float32 matrix product, and only the rows inside the clip volume
+#   (-w <= x, y, z <= w) are sent to GL. With the default camera the far
+#   plane sits right at the planet's centre, so most of the far hemisphere's
+#   particles never needed drawing. Optionally particles hidden behind the
+#   planet (a sphere of radius 'occluder' at the origin) are dropped too,
+#   which only looks right when the planet is drawn (nearly) opaque.
+#
+#   drawn/total of the last frame give the cull ratio the viewer reports
+
+#-culler--------------------------------------------------------------------------
+#   camera   - genfx.camera.Camera or PixelCamera, read again every frame
+#              (the viewer spins it)
+#   aspect   - viewport width/height
+#   occluder - radius of the opaque planet, None to only cull to the frustum
+class Culler:
+    def __init__(self, camera, aspect, occluder=None):
+        self.camera = camera
+        self.aspect = aspect
+        self.occluder = occluder
+        self.drawn, self.total = 0, 0
+
+    # fraction of the last frame's particles that were culled
+    @property
+    def ratio(self):
+        return 1 - self.drawn/self.total if self.total else 0.0
+
+    # mask of the (n, 3) 'positions' that can be seen
+    def visible(self, positions):
+        mat = self.camera.matrix(self.aspect).astype(np.float32)
+        clip = positions @ mat[:, :3].T
+        clip += mat[:, 3]
+        w = clip[:, 3]
+        np.abs(clip[:, :3], out=clip[:, :3])
+        keep = clip[:, 0] <= w
+        keep &= clip[:, 1] <= w
+        keep &= clip[:, 2] <= w
+        if self.occluder is not None and keep.any():
+            keep[keep] = ~self.occluded(positions[keep])
+        return keep
+
+    # mask of 'points' the planet sphere hides from the eye: the segment from
+    # the eye to the point enters the sphere before reaching the point
+    def occluded(self, points):
+        eye = np.linalg.inv(self.camera.modelview())[:3, 3]
+        d = points - eye.astype(np.float32)
+        a = np.einsum("ij,ij->i", d, d)
+        b = d @ eye.astype(np.float32)
+        c = eye @ eye - self.occluder*self.occluder
+        disc = b*b - a*c
+        hit = disc > 0
+        # nearest intersection t (as a fraction of the segment) in (0, 1)
+        t = np.full(len(points), np.inf, dtype=np.float32)
+        t[hit] = (-b[hit] - np.sqrt(disc[hit]))/a[hit]
+        return (t > 0) & (t < 1)
+
+    # the visible particles of a frame as packed rows (see genfx.gldraw.pack)
+    #   rows may be packed rows already, or positions with 'colors' given
+    def cull(self, rows, colors=None):
+        rows = np.asarray(rows)
+        keep = self.visible(rows[:, :3])
+        self.drawn, self.total = int(np.count_nonzero(keep)), len(rows)
+        if colors is not None:
+            return pack(rows[keep], np.asarray(colors)[keep])
+        return rows[keep].reshape(-1, PACKED)
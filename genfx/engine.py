@@ -0,0 +1,491 @@
+import heapq, itertools, math
+
+import numpy as np
+
+from genfx import kernels
+from genfx.gradient import GRADIENTS, toGradient
+from genfx.metrics import NO_METRICS
+from genfx.streams import Stream, uniformBatch
+
+#-sphere-surface-constants (see genparts.py)-------------------------------------
+GRAVITY = -50
+P_VEL, P_VEL_VAR = 15, 20
+P_VAR = 5
+SPAWN_RAD = 0.1 # position angle variation (polar/azimuth in spherical coords.)
+RADIUS = 25
+P_LIFESPAN = 0.25
+P_CHILDREN = 15 # particles spawned per update by each surface system
+
+#-firework-constants (see particle.py)--------------------------------------------
+FW_GRAVITY = -100
+EXPL_VEL_M, EXPL_VEL_V = 40, 40
+EXPL_SHAPE = 0.75
+EXPL_R_MIN, EXPL_R_MAX = math.pi/4, 3*math.pi/4
+FW_LIFESPAN = 1.5
+FW_CHILDREN = 300 # particles spawned once by each firework
+
+#-storage-constants---------------------------------------------------------------
+DTYPE = np.float32 # packed float32 so buffers can go straight to GL
+INITIAL_CAPACITY = 4096
+
+#-particle-storage----------------------------------------------------------------
+# Struct-of-arrays store for every live particle in the simulation
+#   each attribute of the old Particle class is one contiguous array, and only
+#   the first 'count' rows are live. Dead rows are compacted away (stably, so
+#   particles keep their spawn order) at the end of every update.
+#   grad  - row of the particle's color gradient in genfx.gradient.GRADIENTS
+#   phase - point of that gradient the particle was born at (col is looked up
+#           at phase + (1 - phase)*age/lifespan)
+#   owner - id of the ParticleSystem that spawned the particle
+#   jit   - use the fused loops of genfx.kernels (on when Numba is installed)
+class ParticleBuffer:
+    FIELDS = (("pos", 3), ("vel", 3), ("acc", 3), ("col", 4), ("grad", 0), ("phase", 0), ("age", 0), ("lifespan", 0), ("owner", 0))
+    INTEGER_FIELDS = ("grad", "owner")
+    gradients = GRADIENTS
+    jit = kernels.ENABLED
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.count = 0
+        self.capacity = 0
+        self._resize(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _resize(self, capacity):
+        for name, width in self.FIELDS:
+            dtype = np.int64 if name in self.INTEGER_FIELDS else DTYPE
+            shape = (capacity, width) if width else (capacity,)
+            new = np.zeros(shape, dtype=dtype)
+            if self.capacity:
+                new[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    # append 'n' new particles
+    #   any argument may be a single row, which is broadcast to all n particles
+    #   gradient - id of a gradient in self.gradients (see GradientTable.id)
+    def add(self, position, velocity, acceleration, gradient, phase, lifespan, owner=-1):
+        position = np.asarray(position, dtype=DTYPE).reshape(-1, 3)
+        n = len(position)
+        if self.count + n > self.capacity:
+            self._resize(max(2*self.capacity, self.count + n))
+        s = slice(self.count, self.count + n)
+        self.pos[s] = position
+        self.vel[s] = velocity
+        self.acc[s] = acceleration
+        self.grad[s] = gradient
+        self.phase[s] = phase
+        self.gradients.colors(self.grad[s], self.phase[s], DTYPE(0), out=self.col[s])
+        self.age[s] = 0
+        self.lifespan[s] = lifespan
+        self.owner[s] = owner
+        self.count += n
+
+    # advance every live particle by dt (same integration as Particle.update)
+    #   radius   - if given, particles that end up inside this radius are killed
+    #   collider - if given (a genfx.collide.MeshCollider), particles whose
+    #              step crosses into the mesh or ends inside it are killed
+    def update(self, dt, radius=None, collider=None):
+        self.compact(self.advance(dt, radius, collider))
+
+    # the integration half of update(): returns the mask of particles to keep
+    def advance(self, dt, radius=None, collider=None):
+        n = self.count
+        if self.jit and collider is None:
+            keep = np.empty(n, dtype=bool)
+            kernels.advance(self.pos, self.vel, self.acc, self.col, self.grad, self.phase, self.gradients.lut, self.age,
+                            self.lifespan, n, DTYPE(dt), DTYPE(-1 if radius is None else radius*radius), keep)
+            return keep
+        age, vel, pos = self.age[:n], self.vel[:n], self.pos[:n]
+        age += dt
+        vel += self.acc[:n] * DTYPE(dt)
+        last = pos.copy() if collider is not None else None
+        pos += vel * DTYPE(dt)
+        # update color
+        self.gradients.colors(self.grad[:n], self.phase[:n], age / self.lifespan[:n], out=self.col[:n])
+        # kill if too old or below sphere surface
+        keep = age < self.lifespan[:n]
+        if radius is not None:
+            keep &= pos[:, 0]*pos[:, 0] + pos[:, 1]*pos[:, 1] + pos[:, 2]*pos[:, 2] > radius*radius
+        if collider is not None:
+            keep[keep] = ~collider.hits(last[keep], pos[keep])
+        return keep
+
+    # kill every particle spawned by one of the given systems
+    def removeOwners(self, owners):
+        if self.count:
+            self.compact(~np.isin(self.owner[:self.count], owners))
+
+    # keep only the live rows flagged in 'keep', preserving their order
+    def compact(self, keep):
+        if keep.all():
+            return
+        if self.jit:
+            for name, width in self.FIELDS:
+                count = (kernels.compactRows if width else kernels.compactValues)(getattr(self, name), keep, self.count)
+            self.count = count
+            return
+        idx = np.flatnonzero(keep)
+        for name, _ in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:len(idx)] = arr[idx]
+        self.count = len(idx)
+
+#-particle-systems----------------------------------------------------------------
+# Emitter on the surface of the planet (genparts.ParticleSystem)
+#   sprays P_CHILDREN particles per update along the surface normal, with the
+#   spawn point jittered in spherical coordinates and gravity pulling back
+#   towards the centre of the planet
+class SurfaceSystem:
+    CHILDREN = P_CHILDREN
+    DRAWS = 6*P_CHILDREN # random numbers taken by each spawn
+    SPAWNS_ONCE = False
+    CHILD_LIFESPAN = P_LIFESPAN
+    # everything but the random stream that makes up a system's state (see genfx.snapshot)
+    STATE = ("pos", "spos", "normal", "gravity", "speed", "var", "spawnrad", "grad", "phase", "id", "canSpawn", "born", "lifespan", "alive")
+    jit = kernels.ENABLED # spawn with genfx.kernels.surfaceChildren
+
+    # startColor may be a genfx.gradient.Gradient, endColor is then unused
+    def __init__(self, position, startColor, endColor, lifespan=0.75, speed=P_VEL, var=P_VAR, spawnrad=SPAWN_RAD):
+        # define system properties
+        self.pos = np.asarray(position, dtype=float)
+        self.spos = np.array(xyzToSpherical(*self.pos))
+        self.normal = self.pos / math.sqrt(self.pos @ self.pos)
+        self.gravity = GRAVITY*self.normal
+        self.speed = speed
+        self.var = var
+        self.spawnrad = spawnrad
+
+        self.grad = GRADIENTS.id(toGradient(startColor, endColor))
+        self.phase = 0.0 # age/lifespan as of the last update, where children start on the gradient
+
+        self.id = -1
+        self.rng = None # random stream, given by ParticleEngine.addSystem
+        self.canSpawn = True
+
+        self.age = 0 # as of the last time the registry looked (see EmitterRegistry)
+        self.born = None # engine clock when it was added
+        self.lifespan = lifespan
+        self.alive = True
+
+    # build one system per row of 'positions' in a single pass
+    #   lifespans/speed/var/spawnrad may be scalars or one value per system
+    @classmethod
+    def many(cls, positions, startColor, endColor, lifespans=0.75, speed=P_VEL, var=P_VAR, spawnrad=SPAWN_RAD):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n = len(positions)
+        rad = np.sqrt(np.einsum("ij,ij->i", positions, positions))
+        spos = np.stack([rad, np.arccos(positions[:, 2]/rad), np.arctan2(positions[:, 1], positions[:, 0])], axis=-1)
+        normals = positions / rad[:, None]
+        grad = GRADIENTS.id(toGradient(startColor, endColor))
+        lifespans, speed, var, spawnrad = (np.broadcast_to(v, n).tolist() for v in (lifespans, speed, var, spawnrad))
+
+        systems = []
+        for ii in range(n):
+            sys = cls.__new__(cls)
+            sys.pos, sys.spos, sys.normal, sys.gravity = positions[ii], spos[ii], normals[ii], GRAVITY*normals[ii]
+            sys.speed, sys.var, sys.spawnrad = speed[ii], var[ii], spawnrad[ii]
+            sys.grad, sys.phase = grad, 0.0
+            sys.id, sys.rng, sys.canSpawn = -1, None, True
+            sys.age, sys.born, sys.lifespan, sys.alive = 0, None, lifespans[ii], True
+            systems.append(sys)
+        return systems
+
+    # push this update's children into the particle buffer
+    def spawn(self, particles):
+        self.spawnBatch([self], particles)
+
+    # spawn the children of every given system with one batched draw
+    #   each system still draws from its own stream, in the same order a
+    #   single system would, so batching does not change the result
+    #   children  - keep only this many of each system's children (see
+    #               genfx.governor); all of them are still drawn
+    #   lifeScale - factor on the children's lifespan
+    @staticmethod
+    def spawnBatch(systems, particles, children=P_CHILDREN, lifeScale=1):
+        n = P_CHILDREN
+        u = uniformBatch([sys.rng for sys in systems], SurfaceSystem.DRAWS)
+        spos = np.array([sys.spos for sys in systems])
+        normal = np.array([sys.normal for sys in systems])
+        spawnrad, speed, var = (np.array([getattr(sys, name) for sys in systems])[:, None] for name in ("spawnrad", "speed", "var"))
+
+        if SurfaceSystem.jit:
+            pos, vel = kernels.surfaceChildren(spos, normal, spawnrad[:, 0], speed[:, 0], var[:, 0], u, n, SPAWN_RAD, P_VEL_VAR)
+        else:
+            # spherical jitter around the emitter
+            pol = spos[:, 1:2] + (-SPAWN_RAD + (2*SPAWN_RAD)*u[:, :n])
+            azi = spos[:, 2:3] + (-spawnrad + (2*spawnrad)*u[:, n:2*n])
+            pos = sphericalToXYZ(spos[:, 0:1], pol, azi)
+            # speed variance along the normal plus per-component spread
+            mag = speed + (-P_VEL_VAR + (2*P_VEL_VAR)*u[:, 2*n:3*n])
+            vel = mag[:, :, None]*normal[:, None, :] + (-var[:, :, None] + (2*var[:, :, None])*u[:, 3*n:].reshape(-1, n, 3))
+
+        m = children
+        particles.add(pos[:, :m].reshape(-1, 3), vel[:, :m].reshape(-1, 3),
+                      np.repeat([sys.gravity for sys in systems], m, axis=0),
+                      np.repeat([sys.grad for sys in systems], m),
+                      np.repeat([sys.phase for sys in systems], m),
+                      lifeScale*SurfaceSystem.CHILD_LIFESPAN, np.repeat([sys.id for sys in systems], m))
+
+# Single-shot firework burst (particle.ParticleSystem)
+#   releases FW_CHILDREN particles on its first update and then only ages
+class FireworkSystem:
+    CHILDREN = FW_CHILDREN
+    DRAWS = 2*FW_CHILDREN
+    SPAWNS_ONCE = True
+    CHILD_LIFESPAN = FW_LIFESPAN
+    STATE = ("pos", "grad", "phase", "id", "canSpawn", "born", "lifespan", "alive")
+
+    def __init__(self, position, startColor, endColor, lifespan=3):
+        # define system properties
+        self.pos = np.asarray(position, dtype=float)
+
+        self.grad = GRADIENTS.id(toGradient(startColor, endColor))
+        self.phase = 0.0
+
+        self.id = -1
+        self.rng = None # random stream, given by ParticleEngine.addSystem
+        self.canSpawn = True
+
+        self.age = 0 # as of the last time the registry looked (see EmitterRegistry)
+        self.born = None # engine clock when it was added
+        self.lifespan = lifespan
+        self.alive = True
+
+    def spawn(self, particles):
+        self.spawnBatch([self], particles)
+
+    @staticmethod
+    def spawnBatch(systems, particles, children=FW_CHILDREN, lifeScale=1):
+        n = FW_CHILDREN
+        u = uniformBatch([sys.rng for sys in systems], FireworkSystem.DRAWS)
+        mag = EXPL_VEL_M + (-EXPL_VEL_V + (2*EXPL_VEL_V)*u[:, :n])
+        rad = EXPL_R_MIN + (EXPL_R_MAX - EXPL_R_MIN)*u[:, n:]
+        vel = np.zeros((len(systems), n, 3))
+        vel[..., 0] = (mag*2*(1-EXPL_SHAPE))*np.cos(rad)
+        vel[..., 1] = (mag*2*EXPL_SHAPE)*np.sin(rad)
+        m = children
+        particles.add(np.repeat([sys.pos for sys in systems], m, axis=0), vel[:, :m].reshape(-1, 3), [0, FW_GRAVITY, 0],
+                      np.repeat([sys.grad for sys in systems], m),
+                      np.repeat([sys.phase for sys in systems], m),
+                      lifeScale*FireworkSystem.CHILD_LIFESPAN, np.repeat([sys.id for sys in systems], m))
+        for sys in systems:
+            sys.canSpawn = False
+
+# Ring of 'count' surface systems at random angles around the x axis, where the
+# plane at 'x' cuts a planet of radius r (one diameter slice of genesis.py)
+#   lifespans are lifeMean +- lifeVar, angles and lifespans come from 'rng'
+def surfaceRing(x, r, count, rng, startColor, endColor, lifeMean, lifeVar, **kwargs):
+    minRad = math.sqrt( r**2 - x**2 )
+    ang = rng.uniform(0, 2*math.pi, count)
+    life = lifeMean + rng.uniform(-lifeVar, lifeVar, count)
+    positions = np.stack([np.full(count, x), minRad*np.sin(ang), minRad*np.cos(ang)], axis=-1)
+    return SurfaceSystem.many(positions, startColor, endColor, life, **kwargs)
+
+#-emitter-registry----------------------------------------------------------------
+# Live particle systems in stable slots, with a heap of when each one dies
+#   'slots' holds the systems densely (sys.slot is a system's index); removing
+#   one moves the last system into its slot, so it is O(1) and the list is
+#   never rebuilt. A system's age is the registry clock minus the clock it
+#   was added at (sys.born), so nothing is done per system while it just
+#   ages: sys.age is only brought up to date for the systems that spawn and
+#   the ones retire() looks at. Birth plus lifespan goes in a min-heap, so
+#   retire() only looks at the systems due to die instead of scanning them
+#   all, and still kills each in exactly the update its age reaches its
+#   lifespan. Slots are not in creation order, so the systems that still
+#   spawn are also kept per kind in lists, in id order: the engine numbers
+#   systems as it adds them, so appending keeps the order, and the lists only
+#   change when a system is added, finishes a burst or is retired.
+#   clock - engine clock the systems' birth clocks are on (0 for a new engine)
+class EmitterRegistry:
+    SLACK = 1e-6 # seconds a death is looked at early, for the rounding of clock differences
+
+    def __init__(self, systems=(), clock=0.0):
+        self.slots = []
+        self.heap = []
+        self.spawners = {} # kind -> [systems that spawn], by id
+        self.groups = [] # (kind, spawners[kind]) of the kinds that spawn, by lowest id
+        self.clock = clock # simulated seconds the engine has run
+        self.order = itertools.count() # heap tie-break
+        for sys in systems:
+            self.add(sys)
+        # systems handed over at once can come in any order
+        for group in self.spawners.values():
+            group.sort(key=systemId)
+        self.regroup()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    # a system that has no birth clock yet is born 'sys.age' seconds ago
+    def add(self, sys):
+        if sys.born is None:
+            sys.born = self.clock - sys.age
+        sys.age = self.clock - sys.born
+        sys.slot = len(self.slots)
+        self.slots.append(sys)
+        heapq.heappush(self.heap, (sys.born + sys.lifespan, next(self.order), sys))
+        if sys.canSpawn:
+            group = self.spawners.setdefault(type(sys), [])
+            group.append(sys)
+            if len(group) == 1:
+                self.groups.append((type(sys), group)) # the newest id, so the last kind
+
+    # take 'sys' out of the registry; its heap entry is skipped when retire()
+    # comes to it
+    def remove(self, sys):
+        if sys.slot is not None:
+            self.vacate(sys)
+            self.stopSpawning([sys])
+
+    def vacate(self, sys):
+        last = self.slots.pop()
+        if last is not sys:
+            self.slots[sys.slot] = last
+            last.slot = sys.slot
+        sys.slot = None
+
+    # [(kind, systems)] of the systems that spawn this update, each kind in
+    # id order, and the kinds in the order of their lowest id
+    def spawning(self):
+        return self.groups
+
+    # 'systems' spawn no more (a burst has gone off, or they were removed)
+    def stopSpawning(self, systems):
+        stopped = set(systems)
+        for kind in {type(sys) for sys in stopped}:
+            group = self.spawners.get(kind)
+            if group:
+                group[:] = [sys for sys in group if sys not in stopped]
+        self.regroup()
+
+    # order the kinds that still spawn by their lowest id
+    def regroup(self):
+        self.groups = sorted(((kind, group) for kind, group in self.spawners.items() if group), key=lambda item: item[1][0].id)
+
+    # remove and return the systems whose age has reached their lifespan
+    def retire(self):
+        dead, notYet = [], []
+        while self.heap and self.heap[0][0] <= self.clock + self.SLACK:
+            _, _, sys = heapq.heappop(self.heap)
+            if sys.slot is None: # removed already
+                continue
+            sys.age = self.clock - sys.born
+            if sys.age < sys.lifespan:
+                notYet.append(sys)
+                continue
+            sys.alive = False
+            self.vacate(sys)
+            dead.append(sys)
+        for sys in notYet:
+            heapq.heappush(self.heap, (sys.born + sys.lifespan, next(self.order), sys))
+        if dead:
+            self.stopSpawning(dead)
+        return dead
+
+#-engine--------------------------------------------------------------------------
+# Owns every particle system and the shared particle buffer
+#   radius - planet radius for the inside-sphere kill rule (None for fireworks)
+#   collider - genfx.collide.MeshCollider for a planet that is not a sphere
+#   rng    - genfx.streams.Stream (or seed for one) that new systems draw
+#            their own streams from
+#   metrics - genfx.metrics.FrameMetrics to time the spawn/update/cull phases in
+#   governor - genfx.governor.Governor limiting how many particles are spawned
+class ParticleEngine:
+    def __init__(self, radius=None, rng=None, metrics=NO_METRICS, collider=None, governor=None):
+        self.registry = EmitterRegistry()
+        self.particles = ParticleBuffer()
+        self.radius = radius
+        self.collider = collider
+        self.rng = rng if isinstance(rng, Stream) else Stream(rng)
+        self.nextId = 0
+        self.metrics = metrics
+        self.governor = governor
+
+    # live systems, in slot order (see EmitterRegistry); assigning a list
+    # replaces them all, on the same clock
+    @property
+    def systems(self):
+        return self.registry.slots
+
+    @systems.setter
+    def systems(self, systems):
+        self.registry = EmitterRegistry(systems, self.registry.clock)
+
+    # register a system, giving it the next stream of self.rng unless 'rng' is given
+    def addSystem(self, system, rng=None):
+        system.id = self.nextId
+        system.rng = self.rng.spawn() if rng is None else rng
+        self.nextId += 1
+        self.registry.add(system)
+        return system
+
+    # register a list of systems in one call
+    def addSystems(self, systems):
+        for system in systems:
+            self.addSystem(system)
+        return systems
+
+    # one simulation step, in the same order as ParticleSystem.update:
+    # age systems, move/cull children, spawn, recolor systems, retire the dead
+    #   systems age with the registry clock; only the ones that spawn read
+    #   their age and phase, so only theirs are brought up to date
+    def update(self, dt):
+        metrics = self.metrics
+        registry = self.registry
+        with metrics.time("update"):
+            registry.clock += dt
+            keep = self.particles.advance(dt, self.radius, self.collider)
+        with metrics.time("cull"):
+            self.particles.compact(keep)
+        with metrics.time("spawn"):
+            # spawn the children of every system of a kind in one batch, in
+            # creation order so the particles come out in the same order
+            clock, governor, bursts = registry.clock, self.governor, []
+            for kind, group in registry.spawning():
+                if governor is None:
+                    kind.spawnBatch(group, self.particles)
+                else:
+                    children = governor.children(kind.CHILDREN, len(group), len(self.particles))
+                    kind.spawnBatch(group, self.particles, children, governor.lifeScale)
+                for sys in group:
+                    sys.age = clock - sys.born
+                    sys.phase = sys.age/sys.lifespan
+                if kind.SPAWNS_ONCE:
+                    bursts.extend(group)
+            if bursts:
+                registry.stopSpawning(bursts)
+        with metrics.time("cull"):
+            dead = self.registry.retire()
+            if dead:
+                self.particles.removeOwners([sys.id for sys in dead])
+
+    # views of the live particles, ready for drawing
+    def positions(self):
+        return self.particles.pos[:self.particles.count]
+
+    def colors(self):
+        return self.particles.col[:self.particles.count]
+
+#-helper/utility-functions--------------------------------------------------------
+def systemId(sys):
+    return sys.id
+
+# same as genparts.colorInterp, but works on arrays of colors/ages
+def colorInterp(initial, final, age, particleLifespan = 1):
+    return initial + (age/particleLifespan)*(final - initial)
+
+def xyzToSpherical(x, y, z):
+    rad = math.sqrt(x**2+y**2+z**2)
+    return [rad, math.acos(z/rad), math.atan2(y,x)]
+
+# vectorised over pol/azi arrays, returns an (n, 3) array
+def sphericalToXYZ(rad, pol, azi):
+    pol, azi = np.broadcast_arrays(pol, azi)
+    return np.stack([rad*np.sin(pol)*np.cos(azi),
+                     rad*np.sin(pol)*np.sin(azi),
+                     rad*np.cos(pol)], axis=-1)
@@ -0,0 +1,271 @@
+import argparse, os, sys, time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from genfx import scenefile
+from genfx.gldraw import PACKED, pack
+from genfx.metrics import NO_METRICS
+from genfx.recording import RecordedScene
+from genfx.scenes import SCENES
+from genfx.simulation import Simulation, TARGET_FPS
+
+# Live frames in shared memory
+#   a Publisher writes the packed (x, y, z, r, g, b, a) rows of every frame of
+#   a running simulation into a ring of 'slots' frames in one named
+#   shared_memory block; any number of Subscribers in other processes map the
+#   block and read frames at their own pace. The writer never waits for
+#   anybody: each slot is guarded by a sequence lock (the writer sets 'begin'
+#   to the frame's sequence number, writes the rows, then sets 'end'; a
+#   reader copies the rows and keeps them only if 'begin' still matches), so
+#   a slow reader simply skips the frames that were overwritten under it, and
+#   readers can attach and detach at any time.
+#
+#   a slot holds at most 'capacity' particles; bigger frames are cut to that
+#   (their full count is kept in the slot). The header words are 8 byte
+#   aligned integers, which are read and written whole on the platforms
+#   numpy runs on, and the writer stores them in the order above.
+#
+#   python -m genfx.framestream publish genesis --name genfx
+#   python -m genfx.framestream view genfx
+#   python -m genfx.framestream record genfx genesis.rec --frames 600
+
+#-constants-----------------------------------------------------------------------
+MAGIC = 0x67656e6678667331 # "genfxfs1"
+SLOTS = 4
+CAPACITY = 200000 # particles per slot
+HEADER = 8 # int64 words: magic, slots, capacity, latest sequence, closed, dt, radius, spare
+SLOT_HEADER = 4 # int64 words per slot: begin, end, frame number, particle count
+NO_RADIUS = float("nan")
+PUBLISHING = set() # streams published from this process
+
+#-layout--------------------------------------------------------------------------
+# (header, slot headers, slot rows) views of a block of 'slots' x 'capacity'
+def views(buf, slots, capacity):
+    header = np.ndarray(HEADER, dtype=np.int64, buffer=buf)
+    slotHeaders = np.ndarray((slots, SLOT_HEADER), dtype=np.int64, buffer=buf, offset=8*HEADER)
+    rows = np.ndarray((slots, capacity, PACKED), dtype=np.float32, buffer=buf, offset=8*(HEADER + slots*SLOT_HEADER))
+    return header, slotHeaders, rows
+
+def blockSize(slots, capacity):
+    return 8*(HEADER + slots*SLOT_HEADER) + 4*slots*capacity*PACKED
+
+#-publisher-----------------------------------------------------------------------
+# single writer of the stream 'name'
+class Publisher:
+    def __init__(self, name, dt, radius=None, slots=SLOTS, capacity=CAPACITY):
+        self.name = name
+        self.block = shared_memory.SharedMemory(name=name, create=True, size=blockSize(slots, capacity))
+        self.header, self.slotHeaders, self.rows = views(self.block.buf, slots, capacity)
+        self.slots, self.capacity = slots, capacity
+        self.header[:] = 0
+        self.slotHeaders[:] = -1
+        self.header[[1, 2]] = slots, capacity
+        self.header[5:7].view(np.float64)[:] = dt, NO_RADIUS if radius is None else radius
+        self.header[0] = MAGIC # last, so readers only accept a ready block
+        self.seq = 0
+        PUBLISHING.add(name)
+
+    # write the current frame of 'sim'
+    def publish(self, sim):
+        self.publishRows(sim.frameNum, sim.positions(), sim.colors())
+
+    def publishRows(self, frameNum, positions, colors):
+        seq = self.seq + 1
+        slot = self.slotHeaders[seq % self.slots]
+        n = len(positions)
+        m = min(n, self.capacity)
+        slot[0] = seq # readers of the old frame in this slot will now reject it
+        pack(positions[:m], colors[:m], self.rows[seq % self.slots, :m])
+        slot[2], slot[3] = frameNum, n
+        slot[1] = seq
+        self.header[3] = seq
+        self.seq = seq
+
+    def close(self):
+        if self.block is None:
+            return
+        self.header[4] = 1
+        self.header, self.slotHeaders, self.rows = None, None, None
+        self.block.close()
+        self.block.unlink()
+        PUBLISHING.discard(self.name)
+        self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+#-subscriber----------------------------------------------------------------------
+# Reader of the stream 'name', usable like a genfx.recording.Replay
+#   step() moves to the newest frame published (never waiting for one), and
+#   packed()/positions()/colors() are a private copy of it; next() instead
+#   returns every frame in order as long as the reader keeps up. 'finished'
+#   turns True once the publisher has closed and its last frame is held.
+class Subscriber:
+    def __init__(self, name):
+        # the publisher owns the block; don't let this process' tracker unlink it
+        if sys.version_info >= (3, 13):
+            self.block = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.block = shared_memory.SharedMemory(name=name)
+            if name not in PUBLISHING and os.name == "posix":
+                # tracked under the POSIX name, which 'name' reports without its slash
+                resource_tracker.unregister("/" + self.block.name, "shared_memory")
+        magic, slots, capacity = np.ndarray(3, dtype=np.int64, buffer=self.block.buf).tolist()
+        if magic != MAGIC:
+            self.block.close()
+            raise ValueError("%r is not a genfx frame stream" % name)
+        self.header, self.slotHeaders, self.rows = views(self.block.buf, slots, capacity)
+        self.slots = slots
+        self.dt, radius = self.header[5:7].view(np.float64).tolist()
+        self.scene = RecordedScene(None if np.isnan(radius) else radius)
+        self.metrics = NO_METRICS
+        self.governor = None
+        self.systems = () # only particles are published
+        self.seq = 0 # sequence number of the frame held
+        self.frameNum = 0
+        self.count = 0 # particles in the frame held (before any cut)
+        self.skipped = 0 # frames overwritten before this reader got to them
+        self.frame = np.zeros((0, PACKED), dtype=np.float32)
+
+    @property
+    def closed(self):
+        return bool(self.header[4])
+
+    @property
+    def finished(self):
+        return self.closed and int(self.header[3]) <= self.seq
+
+    # the frame held is the last one there is so far
+    @property
+    def last(self):
+        return self.frameNum
+
+    # copy frame 'seq' if it is still in its slot; returns whether it was
+    def read(self, seq):
+        slot = self.slotHeaders[seq % self.slots]
+        if slot[1] != seq:
+            return False
+        frameNum, count = int(slot[2]), int(slot[3])
+        frame = self.rows[seq % self.slots, :min(count, len(self.rows[0]))].copy()
+        if slot[0] != seq:
+            return False # overwritten while copying
+        self.seq, self.frameNum, self.count, self.frame = seq, frameNum, count, frame
+        return True
+
+    # move to the newest frame; returns False if there is nothing new
+    def latest(self):
+        while True:
+            seq, held = int(self.header[3]), self.seq
+            if seq <= held:
+                return False
+            if self.read(seq):
+                self.skipped += seq - held - 1 if held else 0
+                return True
+
+    # the frame after the one held, waiting up to 'timeout' seconds for it;
+    # frames already overwritten are skipped (and counted). Returns False on
+    # timeout or once the publisher has closed.
+    def next(self, timeout=None, poll=0.001):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            latest, held = int(self.header[3]), self.seq
+            if latest > held:
+                for seq in range(max(held + 1, latest - self.slots + 1), latest + 1):
+                    if self.read(seq):
+                        self.skipped += seq - held - 1 if held else 0
+                        return True
+            if self.closed or (deadline is not None and time.perf_counter() > deadline):
+                return False
+            time.sleep(poll)
+
+    # Replay/Simulation interface for viewer.run: the step count is ignored,
+    # the viewer shows whatever is newest
+    def step(self, frames=1):
+        self.metrics.beginFrame(self.frameNum + 1)
+        self.latest()
+        return self
+
+    def packed(self):
+        return self.frame
+
+    def positions(self):
+        return self.frame[:, :3]
+
+    def colors(self):
+        return self.frame[:, 3:]
+
+    def close(self):
+        if self.block is None:
+            return
+        self.header, self.slotHeaders, self.rows = None, None, None
+        self.block.close()
+        self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+#-command-line--------------------------------------------------------------------
+# run 'scene' in real time, publishing every frame
+def publishScene(scene, name, seed=0, fps=TARGET_FPS, frames=None, slots=SLOTS, capacity=CAPACITY):
+    from genfx.scheduler import Scheduler
+    sim = Simulation(scene, 1/fps, seed)
+    scheduler = Scheduler(sim)
+    with Publisher(name, sim.dt, scene.radius, slots, capacity) as publisher:
+        last = time.perf_counter()
+        while frames is None or sim.frameNum < frames:
+            now = time.perf_counter()
+            if scheduler.advance(now - last):
+                publisher.publish(sim)
+            last = now
+            time.sleep(max(0.0, sim.dt - (time.perf_counter() - now)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m genfx.framestream", description="Publish a running simulation to shared memory, or attach to one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="simulate a scene in real time and publish its frames")
+    publish.add_argument("scene", help="one of %s, or a .toml/.json scene file" % ", ".join(sorted(SCENES)))
+    publish.add_argument("--name", default="genfx", help="shared memory name of the stream")
+    publish.add_argument("--seed", type=int, default=0)
+    publish.add_argument("--fps", type=float, default=TARGET_FPS)
+    publish.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+    publish.add_argument("--slots", type=int, default=SLOTS)
+    publish.add_argument("--capacity", type=int, default=CAPACITY, help="particles per frame")
+    view = commands.add_parser("view", help="show a stream in a pyglet window")
+    view.add_argument("name")
+    view.add_argument("--fps", type=float, default=TARGET_FPS)
+    record = commands.add_parser("record", help="record a stream for genfx.recording.Replay")
+    record.add_argument("name")
+    record.add_argument("output")
+    record.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        scene = SCENES[args.scene]() if args.scene in SCENES else scenefile.load(args.scene)
+        try:
+            publishScene(scene, args.name, args.seed, args.fps, args.frames, args.slots, args.capacity)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "view":
+        from genfx import viewer
+        from genfx.camera import Camera
+        with Subscriber(args.name) as stream:
+            viewer.run(stream, Camera() if stream.scene.radius else None, sphere=stream.scene.radius, fps=args.fps)
+    else:
+        from genfx.recording import Recorder
+        with Subscriber(args.name) as stream, Recorder(args.output, stream.dt, stream.scene.radius) as recorder:
+            written = 0
+            while (args.frames is None or written < args.frames) and stream.next():
+                recorder.record(stream)
+                written += 1
+            if stream.skipped:
+                print("%d frames were overwritten before they could be recorded" % stream.skipped)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os, queue, struct, threading, zlib
+from fractions import Fraction
+
+import numpy as np
+
+from genfx.simulation import TARGET_FPS
+
+# Streams rendered frames to disk from a background thread
+#   frames go through a bounded queue, so the simulation only waits on the
+#   disk when it gets more than 'queueSize' frames ahead of the writer
+#
+#   formats (picked from the file extension unless given):
+#     'y4m' - uncompressed YUV4MPEG2 in one file (ffmpeg -i out.y4m out.mp4)
+#     'raw' - bare RGBA bytes in one file
+#             (ffmpeg -f rawvideo -pix_fmt rgba -s WxH -r 24 -i out.rgba out.mp4)
+#     'png' - one PNG per frame, path is a pattern such as 'angle/%d.png'
+
+#-constants-----------------------------------------------------------------------
+QUEUE_SIZE = 8
+PNG_LEVEL = 1 # favour speed, the frames are re-encoded anyway
+_STOP = None
+
+#-frame-writer--------------------------------------------------------------------
+class FrameWriter:
+    def __init__(self, path, width, height, fps=TARGET_FPS, format=None, chroma="444", queueSize=QUEUE_SIZE):
+        self.path = path
+        self.width, self.height = width, height
+        self.fps = fps
+        self.format = format or guessFormat(path)
+        self.chroma = chroma
+        if self.format == "y4m" and chroma == "420" and (width % 2 or height % 2):
+            raise ValueError("4:2:0 chroma needs an even frame size, got %dx%d" % (width, height))
+        self.frameNum = 0
+        self.error = None
+
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._file = None
+        if self.format in ("y4m", "raw"):
+            self._file = open(path, "wb")
+            if self.format == "y4m":
+                self._file.write(y4mHeader(width, height, fps, chroma))
+        elif self.format == "png":
+            directory = os.path.dirname(path % 0)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        else:
+            raise ValueError("unknown frame format %r" % self.format)
+        self._thread = threading.Thread(target=self._run, name="FrameWriter", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # queue an (height, width, 4) uint8 RGBA frame, blocking while the queue is full
+    def write(self, frame):
+        if self.error is not None:
+            raise self.error
+        frame = np.asarray(frame, dtype=np.uint8)
+        if frame.shape != (self.height, self.width, 4):
+            raise ValueError("expected a (%d, %d, 4) frame, got %s" % (self.height, self.width, frame.shape))
+        self._queue.put(frame)
+
+    # wait for every queued frame to be written, then close the output
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _STOP:
+                return
+            if self.error is not None:
+                continue # keep draining so write() never blocks forever
+            try:
+                self._writeFrame(frame)
+            except Exception as e:
+                self.error = e
+
+    def _writeFrame(self, frame):
+        self.frameNum += 1
+        if self.format == "y4m":
+            self._file.write(b"FRAME\n")
+            for plane in rgbToYCbCr(frame, self.chroma):
+                self._file.write(plane.tobytes())
+        elif self.format == "raw":
+            self._file.write(frame.tobytes())
+        else:
+            with open(self.path % self.frameNum, "wb") as f:
+                f.write(encodePNG(frame))
+
+#-helper/utility-functions--------------------------------------------------------
+def guessFormat(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".y4m":
+        return "y4m"
+    if ext == ".png":
+        return "png"
+    return "raw"
+
+def y4mHeader(width, height, fps, chroma):
+    rate = Fraction(fps).limit_denominator(1001)
+    colorspace = "C444" if chroma == "444" else "C420jpeg"
+    return ("YUV4MPEG2 W%d H%d F%d:%d Ip A1:1 %s\n" % (width, height, rate.numerator, rate.denominator, colorspace)).encode()
+
+# RGBA -> Y, Cb, Cr planes (BT.601, studio range, as ffmpeg expects for y4m)
+#   chroma '420' averages each 2x2 block of Cb/Cr
+def rgbToYCbCr(frame, chroma="444"):
+    rgb = frame[..., :3].astype(np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    y = 16 + (65.481*r + 128.553*g + 24.966*b)/255
+    cb = 128 + (-37.797*r - 74.203*g + 112.0*b)/255
+    cr = 128 + (112.0*r - 93.786*g - 18.214*b)/255
+    if chroma == "420":
+        h, w = cb.shape
+        cb = cb.reshape(h//2, 2, w//2, 2).mean(axis=(1, 3))
+        cr = cr.reshape(h//2, 2, w//2, 2).mean(axis=(1, 3))
+    return [np.clip(np.rint(p), 0, 255).astype(np.uint8) for p in (y, cb, cr)]
+
+# minimal RGBA PNG encoder (no filtering), so no imaging library is needed
+def encodePNG(frame, level=PNG_LEVEL):
+    height, width = frame.shape[:2]
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    rows = np.empty((height, width*4 + 1), dtype=np.uint8)
+    rows[:, 0] = 0 # filter type 'None' for every scanline
+    rows[:, 1:] = frame.reshape(height, width*4)
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), level))
+            + chunk(b"IEND", b""))
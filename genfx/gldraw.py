@@ -0,0 +1,110 @@
+import ctypes
+
+import numpy as np
+
+# Vertex buffer draw path for the viewer
+#   the particles are packed into one interleaved float32 array
+#   (x, y, z, r, g, b, a) and uploaded with a single glBufferData per frame,
+#   and the planet is uploaded once as a vertex buffer plus an index buffer,
+#   so a frame is one or two draw calls however many particles there are.
+#   Fixed-function client arrays are used, so this runs in the same legacy
+#   GL context (gluPerspective/glRotatef) as the rest of the viewer.
+#
+#   'gl' is the pyglet.gl module, passed in so this module never imports GL
+
+#-constants-----------------------------------------------------------------------
+PACKED = 7 # floats per particle: position + color
+STRIDE = PACKED*4
+
+#-particles-----------------------------------------------------------------------
+class ParticleDraw:
+    def __init__(self, gl):
+        self.gl = gl
+        self.vbo = genBuffer(gl)
+        self.packed = np.empty((0, PACKED), dtype=np.float32)
+        self.count = 0
+
+    # copy this frame's particles into the vertex buffer
+    def upload(self, positions, colors):
+        n = len(positions)
+        if len(self.packed) < n:
+            self.packed = np.empty((max(n, 2*len(self.packed)), PACKED), dtype=np.float32)
+        self.uploadPacked(pack(positions, colors, self.packed[:n]))
+
+    # upload rows that are already packed (n, PACKED) float32, e.g. a frame
+    # mapped from a recording (genfx.recording), without another copy
+    def uploadPacked(self, packed):
+        gl = self.gl
+        packed = np.ascontiguousarray(packed, dtype=np.float32)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, packed.nbytes, packed.ctypes.data_as(ctypes.c_void_p), gl.GL_STREAM_DRAW)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        self.count = len(packed)
+
+    # draw the uploaded rows first..first+count (all of them by default) as
+    # 'size' pixel points
+    def draw(self, first=0, count=None, size=1):
+        gl = self.gl
+        count = self.count - first if count is None else count
+        if count <= 0:
+            return
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+        gl.glVertexPointer(3, gl.GL_FLOAT, STRIDE, 0)
+        gl.glColorPointer(4, gl.GL_FLOAT, STRIDE, 3*4)
+        if size != 1:
+            gl.glPointSize(size)
+        gl.glDrawArrays(gl.GL_POINTS, first, count)
+        if size != 1:
+            gl.glPointSize(1)
+        gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+#-static-mesh---------------------------------------------------------------------
+# indexed mesh (see genfx.mesh) uploaded once, drawn in a single color
+class MeshDraw:
+    def __init__(self, gl, vertices, triangles):
+        self.gl = gl
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        indices = np.ascontiguousarray(triangles, dtype=np.uint32)
+        self.nverts, self.nindices = len(vertices), indices.size
+        self.vbo, self.ibo = genBuffer(gl), genBuffer(gl)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices.ctypes.data_as(ctypes.c_void_p), gl.GL_STATIC_DRAW)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices.ctypes.data_as(ctypes.c_void_p), gl.GL_STATIC_DRAW)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    # color - RGBA for the whole mesh
+    # points - draw the vertices as GL_POINTS instead of the triangles
+    def draw(self, color, points=False):
+        gl = self.gl
+        gl.glColor4f(*color)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glVertexPointer(3, gl.GL_FLOAT, 0, 0)
+        if points:
+            gl.glDrawArrays(gl.GL_POINTS, 0, self.nverts)
+        else:
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+            gl.glDrawElements(gl.GL_TRIANGLES, self.nindices, gl.GL_UNSIGNED_INT, 0)
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+#-helper/utility-functions--------------------------------------------------------
+# interleave (n, 3) positions and (n, 4) colors into 'out' ((n, 7) float32)
+def pack(positions, colors, out=None):
+    if out is None:
+        out = np.empty((len(positions), PACKED), dtype=np.float32)
+    out[:, :3] = positions
+    out[:, 3:] = colors
+    return out
+
+def genBuffer(gl):
+    buf = gl.GLuint()
+    gl.glGenBuffers(1, ctypes.byref(buf))
+    return buf.value
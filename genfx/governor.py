@@ -0,0 +1,104 @@
+# Particle budget governor
+#   holds the live particle count under a hard cap and, if given a budget,
+#   the time a simulation step takes under that budget. The engine asks it
+#   how many children each emitter may spawn: never more than the room left
+#   under the cap, and only spawnScale of the usual count while the
+#   simulation is over budget. If that is not enough, the children's
+#   lifespans are shortened by lifeScale as well. Both scales recover once
+#   the pressure is off, lifespans first.
+#
+#   emitters still take all of their random numbers when throttled, so the
+#   particles that do get spawned are the ones an unthrottled run spawns.
+#   The particle cap alone is deterministic; the frame budget follows the
+#   wall clock, so a run throttled by it is not reproducible.
+
+#-constants-----------------------------------------------------------------------
+MAX_PARTICLES = 100000
+HEADROOM = 0.9 # start throttling at this fraction of the cap (or budget)
+RECOVER = 0.75 # and recover below this one
+MIN_SPAWN = 0.05
+MIN_LIFE = 0.25
+SMOOTHING = 0.2 # weight of the newest step time in the running average
+GROWTH = 1.1 # recovery per step, as a factor
+
+#-governor------------------------------------------------------------------------
+#   maxParticles - hard cap on live particles
+#   budget       - seconds one simulation step may take (None to only cap)
+class Governor:
+    def __init__(self, maxParticles=MAX_PARTICLES, budget=None, minSpawn=MIN_SPAWN, minLife=MIN_LIFE):
+        self.maxParticles = maxParticles
+        self.budget = budget
+        self.minSpawn, self.minLife = minSpawn, minLife
+        self.spawnScale = 1.0 # fraction of the usual children spawned
+        self.lifeScale = 1.0 # fraction of the usual child lifespan
+        self.stepTime = 0.0 # running average of the step time (seconds)
+
+        self.refused = 0 # children not spawned because of the cap
+        self.throttledFrames = 0
+        self.events = [] # one record per change of throttling, see report()
+
+    @property
+    def throttled(self):
+        return self.spawnScale < 1 or self.lifeScale < 1
+
+    # children each of 'systems' emitters may spawn this step when they would
+    # normally spawn 'children', with 'live' particles alive
+    def children(self, children, systems, live):
+        wanted = round(children*self.spawnScale)
+        room = max(0, self.maxParticles - live)
+        allowed = min(wanted, room // systems) if systems else wanted
+        self.refused += (wanted - allowed)*systems
+        return allowed
+
+    # update the scales after step 'frameNum' took 'seconds' with 'live' particles
+    def observe(self, frameNum, live, seconds):
+        self.stepTime += SMOOTHING*(seconds - self.stepTime) if self.stepTime else seconds
+        pressure = live/(HEADROOM*self.maxParticles)
+        reason = "particles"
+        if self.budget is not None and self.stepTime/(HEADROOM*self.budget) > pressure:
+            pressure, reason = self.stepTime/(HEADROOM*self.budget), "time"
+
+        before = (self.spawnScale, self.lifeScale)
+        if pressure > 1:
+            if self.spawnScale > self.minSpawn:
+                self.spawnScale = max(self.minSpawn, self.spawnScale/pressure)
+            else:
+                self.lifeScale = max(self.minLife, self.lifeScale/pressure)
+        elif pressure < RECOVER/HEADROOM:
+            if self.lifeScale < 1:
+                self.lifeScale = min(1.0, self.lifeScale*GROWTH)
+            else:
+                self.spawnScale = min(1.0, self.spawnScale*GROWTH)
+
+        if self.throttled:
+            self.throttledFrames += 1
+        if (self.spawnScale, self.lifeScale) != before:
+            self.events.append({"frame": frameNum, "particles": live, "step_ms": 1000*self.stepTime,
+                                "reason": reason if pressure > 1 else "recovering",
+                                "spawn_scale": self.spawnScale, "life_scale": self.lifeScale})
+
+    # summary of the throttling so far
+    #   spans - (first frame, last frame or None while still throttled) of
+    #           every throttled stretch
+    def report(self):
+        spans, start = [], None
+        for event in self.events:
+            on = event["spawn_scale"] < 1 or event["life_scale"] < 1
+            if on and start is None:
+                start = event["frame"]
+            elif not on and start is not None:
+                spans.append((start, event["frame"]))
+                start = None
+        if start is not None:
+            spans.append((start, None))
+        return {"throttled_frames": self.throttledFrames, "refused_children": self.refused, "spans": spans,
+                "min_spawn_scale": min([e["spawn_scale"] for e in self.events], default=1.0),
+                "min_life_scale": min([e["life_scale"] for e in self.events], default=1.0)}
+
+    # one line for the console
+    def summary(self):
+        report = self.report()
+        if not report["throttled_frames"] and not report["refused_children"]:
+            return "governor: never throttled"
+        return "governor: throttled %d frames in %d stretches (spawn down to %.0f%%, lifespan down to %.0f%%), %d children refused at the cap" % (
+            report["throttled_frames"], len(report["spans"]), 100*report["min_spawn_scale"], 100*report["min_life_scale"], report["refused_children"])
@@ -0,0 +1,121 @@
+import numpy as np
+
+# Color gradients baked into lookup tables
+#   a Gradient is a color ramp with any number of stops and an easing curve
+#   between them. The engine does not evaluate it per particle: every
+#   gradient in use is baked once into a row of GRADIENTS, a shared
+#   (gradients, LUT_SIZE, 4) float32 table, and a particle only keeps the id
+#   of its row and the point of the ramp it was born at (its emitter's age
+#   over lifespan). Its color is then one table lookup at the quantized
+#       t = phase + (1 - phase)*age/lifespan
+#   which for a two-stop linear gradient is the color the engine used to
+#   interpolate per particle (to within half a table step).
+#
+#   stops are colors spaced evenly over [0, 1], or [position, color] pairs
+#   easing - how each segment blends into the next: "linear", "smooth"
+#            (smoothstep), "in" (slow start) or "out" (slow end)
+
+#-constants-----------------------------------------------------------------------
+LUT_SIZE = 256 # entries per baked gradient
+ROW = np.dtype((np.void, 16)) # one float32 RGBA entry
+EASINGS = {"linear": lambda t: t,
+           "smooth": lambda t: t*t*(3 - 2*t),
+           "in": lambda t: t*t,
+           "out": lambda t: t*(2 - t)}
+
+#-gradients-----------------------------------------------------------------------
+class Gradient:
+    def __init__(self, stops, easing="linear"):
+        if not len(stops):
+            raise ValueError("a gradient needs at least one stop")
+        if easing not in EASINGS:
+            raise ValueError("unknown easing %r (one of %s)" % (easing, ", ".join(EASINGS)))
+        if all(len(stop) == 2 for stop in stops):
+            positions, colors = zip(*stops)
+        else:
+            positions, colors = np.linspace(0, 1, len(stops)) if len(stops) > 1 else [0.0], stops
+        self.positions = np.array(positions, dtype=float)
+        self.colors = np.array(colors, dtype=float).reshape(-1, 4)
+        self.easing = easing
+        if np.any(np.diff(self.positions) < 0) or self.positions[0] < 0 or self.positions[-1] > 1:
+            raise ValueError("gradient stop positions must rise within [0, 1]")
+
+    # the same ramp as colorInterp(startColor, endColor, ...)
+    @classmethod
+    def ramp(cls, startColor, endColor):
+        return cls([startColor, endColor])
+
+    # colors at the ramp points 't' (an array of numbers in [0, 1])
+    def __call__(self, t):
+        t = np.clip(np.asarray(t, dtype=float), 0, 1)
+        pos = self.positions
+        if len(pos) == 1:
+            return np.broadcast_to(self.colors[0], t.shape + (4,)).copy()
+        seg = np.clip(np.searchsorted(pos, t, side="right") - 1, 0, len(pos) - 2)
+        width = pos[seg + 1] - pos[seg]
+        local = np.divide(t - pos[seg], width, out=np.ones_like(t), where=width > 0)
+        local = EASINGS[self.easing](np.clip(local, 0, 1))[..., None]
+        return self.colors[seg] + local*(self.colors[seg + 1] - self.colors[seg])
+
+    def bake(self, size=LUT_SIZE):
+        return self(np.linspace(0, 1, size)).astype(np.float32)
+
+    # identifies equal gradients, so each is baked only once
+    def key(self):
+        return (self.positions.tobytes(), self.colors.tobytes(), self.easing)
+
+    def __repr__(self):
+        return "Gradient(%r, %r)" % ([[p, c] for p, c in zip(self.positions.tolist(), self.colors.tolist())], self.easing)
+
+# 'startColor' if it already is a Gradient (endColor unused), otherwise the
+# linear ramp between the two colors
+def toGradient(startColor, endColor=None):
+    if isinstance(startColor, Gradient):
+        return startColor
+    return Gradient.ramp(startColor, endColor)
+
+#-lookup-table--------------------------------------------------------------------
+# Baked gradients, one row each; id() adds a gradient (once) and returns its row
+class GradientTable:
+    def __init__(self, size=LUT_SIZE):
+        self.size = size
+        self.gradients = []
+        self.ids = {}
+        self.lut = np.zeros((0, size, 4), dtype=np.float32)
+
+    def id(self, gradient):
+        key = gradient.key()
+        if key not in self.ids:
+            self.ids[key] = len(self.gradients)
+            self.gradients.append(gradient)
+            self.lut = np.concatenate([self.lut, gradient.bake(self.size)[None]])
+        return self.ids[key]
+
+    def __len__(self):
+        return len(self.gradients)
+
+    # colors of particles on gradients 'grad', born at ramp points 'phase',
+    # 'frac' of the way through their lives (float32 arrays), into 'out'
+    def colors(self, grad, phase, frac, out=None):
+        t = (np.float32(1) - phase)*frac
+        t += phase
+        t *= np.float32(self.size - 1)
+        t += np.float32(0.5)
+        idx = t.astype(np.intp)
+        np.clip(idx, 0, self.size - 1, out=idx)
+        idx += grad*self.size
+        if out is None:
+            out = np.empty(idx.shape + (4,), dtype=np.float32)
+        # gather whole 16 byte rows, which is much faster than a 2D fancy index
+        np.take(self.lut.view(ROW).ravel(), idx, out=out.view(ROW).reshape(idx.shape))
+        return out
+
+GRADIENTS = GradientTable() # shared by every engine
+
+#-named-gradients-----------------------------------------------------------------
+# hot white-yellow core through orange and red to a faint ember (genesis)
+FIRE = Gradient([[0.0, [1.0, 0.9, 0.45, 0.95]],
+                 [0.15, [1.0, 0.55, 0.05, 0.95]],
+                 [0.5, [0.95, 0.2, 0.05, 0.6]],
+                 [1.0, [0.35, 0.02, 0.1, 0.1]]], easing="smooth")
+NAMED = {"fire": FIRE}
@@ -0,0 +1,151 @@
+import math, os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Fused per-particle loops for the hot paths of the engine
+#   the NumPy code in genfx.engine allocates a temporary the size of the
+#   buffer for every operation; these loops do the whole update (age,
+#   integrate, recolor, kill test), the compaction and the surface spawn in
+#   one pass without temporaries. They are compiled with Numba when it is
+#   installed (and GENFX_NO_JIT is not set) and used automatically; without
+#   Numba the engine keeps its NumPy code, and these still run as plain
+#   (slow) Python, which is how check() compares them on any machine.
+#
+#   the loops do the same float32 operations in the same order as the NumPy
+#   code, so updates and compaction give identical results; spawn positions
+#   go through a different sin/cos and agree to rounding.
+#
+#   python -m genfx.bench kernels   compares both paths and times them
+
+#-constants-----------------------------------------------------------------------
+ENABLED = numba is not None and not os.environ.get("GENFX_NO_JIT")
+SPAWN_TOLERANCE = 1e-4 # spawn positions/velocities may differ by rounding
+
+def jit(fn):
+    if numba is None:
+        return fn
+    return numba.njit(cache=True, nogil=True)(fn)
+
+#-kernels-------------------------------------------------------------------------
+# ParticleBuffer.advance over the first n rows, writing the keep mask
+#   dt and r2 (squared kill radius, negative for none) are float32, colors
+#   come from the gradient table 'lut' as in GradientTable.colors
+@jit
+def advance(pos, vel, acc, col, grad, phase, lut, age, lifespan, n, dt, r2, keep):
+    one, half = np.float32(1), np.float32(0.5)
+    size = lut.shape[1]
+    scale = np.float32(size - 1)
+    for i in range(n):
+        age[i] += dt
+        for k in range(3):
+            vel[i, k] += acc[i, k]*dt
+            pos[i, k] += vel[i, k]*dt
+        frac = age[i]/lifespan[i]
+        t = ((one - phase[i])*frac + phase[i])*scale + half
+        idx = min(max(int(t), 0), size - 1)
+        for k in range(4):
+            col[i, k] = lut[grad[i], idx, k]
+        alive = age[i] < lifespan[i]
+        if alive and r2 >= 0:
+            alive = pos[i, 0]*pos[i, 0] + pos[i, 1]*pos[i, 1] + pos[i, 2]*pos[i, 2] > r2
+        keep[i] = alive
+
+# move the kept rows of a 2D array to the front, in order; returns the count
+@jit
+def compactRows(arr, keep, n):
+    j = 0
+    for i in range(n):
+        if keep[i]:
+            if i != j:
+                for k in range(arr.shape[1]):
+                    arr[j, k] = arr[i, k]
+            j += 1
+    return j
+
+@jit
+def compactValues(arr, keep, n):
+    j = 0
+    for i in range(n):
+        if keep[i]:
+            arr[j] = arr[i]
+            j += 1
+    return j
+
+# positions and velocities of n children for each surface emitter, from the
+# (systems, 6n) uniforms 'u' laid out as SurfaceSystem.spawnBatch uses them
+@jit
+def surfaceChildren(spos, normal, spawnrad, speed, var, u, n, polVar, speedVar):
+    systems = spos.shape[0]
+    pos = np.empty((systems, n, 3))
+    vel = np.empty((systems, n, 3))
+    for s in range(systems):
+        for c in range(n):
+            pol = spos[s, 1] + (-polVar + (2*polVar)*u[s, c])
+            azi = spos[s, 2] + (-spawnrad[s] + (2*spawnrad[s])*u[s, n + c])
+            pos[s, c, 0] = spos[s, 0]*math.sin(pol)*math.cos(azi)
+            pos[s, c, 1] = spos[s, 0]*math.sin(pol)*math.sin(azi)
+            pos[s, c, 2] = spos[s, 0]*math.cos(pol)
+            mag = speed[s] + (-speedVar + (2*speedVar)*u[s, 2*n + c])
+            for k in range(3):
+                vel[s, c, k] = mag*normal[s, k] + (-var[s] + (2*var[s])*u[s, 3*n + 3*c + k])
+    return pos, vel
+
+#-self-check----------------------------------------------------------------------
+# run the engine with and without the kernels on the same random particles
+# and emitters; returns the largest differences, and raises AssertionError
+# unless updates and compaction agree exactly and spawning to within
+# SPAWN_TOLERANCE. Without Numba the kernels run as Python, so keep n small.
+def check(n=2000, steps=8, systems=50, seed=0):
+    from genfx.engine import ParticleBuffer, SurfaceSystem, GRAVITY, RADIUS
+    from genfx.gradient import GRADIENTS, FIRE
+    from genfx.streams import Stream
+
+    rng = np.random.default_rng(seed)
+    normal = rng.normal(size=(n, 3))
+    normal /= np.linalg.norm(normal, axis=1)[:, None]
+    speed, life = rng.uniform(-5, 30, (n, 1)), rng.uniform(0.1, 0.5, n)
+    grad, phase = GRADIENTS.id(FIRE), rng.uniform(0, 1, n)
+    buffers = []
+    for jit in (False, True):
+        buf = ParticleBuffer(n)
+        buf.jit = jit
+        buf.add(RADIUS*normal, speed*normal, GRAVITY*normal, grad, phase, life)
+        buffers.append(buf)
+    update = 0.0
+    for _ in range(steps):
+        for buf in buffers:
+            buf.update(1/24, RADIUS)
+        a, b = buffers
+        if a.count != b.count:
+            raise AssertionError("kernels kept %d particles, NumPy %d" % (b.count, a.count))
+        for name, _ in ParticleBuffer.FIELDS:
+            diff = float(np.abs(getattr(a, name)[:a.count] - getattr(b, name)[:b.count]).max(initial=0))
+            if diff != 0:
+                raise AssertionError("kernels differ from NumPy by %g in '%s'" % (diff, name))
+            update = max(update, diff)
+
+    spawned = []
+    for jit in (False, True):
+        emitters = SurfaceSystem.many(RADIUS*normal[:systems], [1.0, 0.5, 0.05, 0.95], [1.0, 0.0, 0.1, 0.1], 2.0, spawnrad=0.05)
+        for ii, system in enumerate(emitters):
+            system.id, system.rng = ii, Stream(seed, ii)
+        buf = ParticleBuffer()
+        old, SurfaceSystem.jit = SurfaceSystem.jit, jit
+        try:
+            SurfaceSystem.spawnBatch(emitters, buf)
+        finally:
+            SurfaceSystem.jit = old
+        spawned.append(buf)
+    a, b = spawned
+    if a.count != b.count:
+        raise AssertionError("kernels spawned %d particles, NumPy %d" % (b.count, a.count))
+    spawn = max(float(np.abs(a.pos[:a.count] - b.pos[:b.count]).max()), float(np.abs(a.vel[:a.count] - b.vel[:b.count]).max()))
+    if spawn > SPAWN_TOLERANCE:
+        raise AssertionError("kernel spawn differs from NumPy by %g" % spawn)
+    return {"update": update, "spawn": spawn}
+
@@ -0,0 +1,145 @@
+import numpy as np
+
+from genfx.gldraw import PACKED
+from genfx.raster import MAX_ALPHA, Rasterizer
+
+# Level of detail for crowded parts of the screen
+#   particles are binned into a grid of cellSize x cellSize pixel cells, and
+#   every cell holding more than 'threshold' particles is drawn as a single
+#   aggregate point instead: a cellSize pixel square (glPointSize) at the
+#   centre of the cell. Its particles are first blended per pixel the way
+#   the rasterizer blends them (1 - prod(1 - alpha), alpha weighted mean
+#   color, see genfx.raster.composite), and the square gets the mean of
+#   those pixels' coverage over the cell as its alpha and their coverage
+#   weighted color, so every merged cell keeps its average color over what
+#   is behind it. At most 'threshold' points per cell are then drawn, so the
+#   draw cost is bounded by the resolution rather than by the particle count.
+#
+#   cellSize is the quality knob: 1 merges only particles landing on the same
+#   pixel (no visible change in the software rasterizer; GL blends in draw
+#   order, so moving particles into one point shifts colors there a little),
+#   larger cells lose the detail inside a cell. Cells cut by the edge of the
+#   screen are never merged. error() measures the difference on a real frame.
+
+#-constants-----------------------------------------------------------------------
+CELL_SIZE = 1 # pixels
+THRESHOLD = 4 # particles a cell may hold before it is merged
+MAX_ERROR = (0.05, 4.0) # mean and p99 error() allows, in 0..255 steps at the cell scale
+
+#-level-of-detail-----------------------------------------------------------------
+#   camera        - genfx.camera.Camera or PixelCamera, read again every frame
+#   width, height - viewport in pixels
+class LevelOfDetail:
+    def __init__(self, camera, width, height, cellSize=CELL_SIZE, threshold=THRESHOLD):
+        if cellSize < 1 or threshold < 1:
+            raise ValueError("cellSize and threshold must be at least 1")
+        self.camera = camera
+        self.width, self.height = width, height
+        self.cellSize, self.threshold = cellSize, threshold
+        self.cols, self.rows = width//cellSize, height//cellSize # whole cells only
+        self.drawn, self.total, self.merged = 0, 0, 0
+        self.aggregates = 0 # rows at the end of the last reduce() to draw cellSize wide
+
+    # fraction of the last frame's particles that were merged away
+    @property
+    def ratio(self):
+        return 1 - self.drawn/self.total if self.total else 0.0
+
+    # pixel column, row and ndc depth of the (n, 3) positions, and whether
+    # each is on screen
+    def project(self, positions):
+        mat = self.camera.matrix(self.width/self.height).astype(np.float32)
+        clip = positions @ mat[:, :3].T
+        clip += mat[:, 3]
+        w = clip[:, 3]
+        onScreen = (w > 0) & (np.abs(clip[:, 0]) <= w) & (np.abs(clip[:, 1]) <= w) & (np.abs(clip[:, 2]) <= w)
+        w = np.where(onScreen, w, 1)
+        px = np.clip(((clip[:, 0]/w + 1)*(self.width/2)).astype(np.int64), 0, self.width - 1)
+        py = np.clip(((1 - clip[:, 1]/w)*(self.height/2)).astype(np.int64), 0, self.height - 1) # row 0 at the top
+        return px, py, clip[:, 2]/w, onScreen
+
+    # world points whose projections are the pixel positions x, y at ndc depth z
+    def unproject(self, x, y, z):
+        inv = np.linalg.inv(self.camera.matrix(self.width/self.height))
+        ndc = np.stack([2*x/self.width - 1, 1 - 2*y/self.height, z, np.ones_like(z)], axis=-1)
+        world = ndc @ inv.T
+        return world[:, :3]/world[:, 3:]
+
+    # packed rows (see genfx.gldraw.pack) with the crowded cells merged: the
+    # rows left alone in their original order, then one row per merged cell
+    # (self.aggregates of them, to be drawn as cellSize pixel points)
+    def reduce(self, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, PACKED)
+        s, width = self.cellSize, self.width
+        px, py, depth, onScreen = self.project(rows[:, :3])
+        onScreen &= (px < self.cols*s) & (py < self.rows*s)
+        cells = (py//s)*self.cols + px//s
+        # sorting the occupied cells costs O(n log n) however many cells there are
+        keys, inverse, counts = np.unique(cells[onScreen], return_inverse=True, return_counts=True)
+        dense = counts > self.threshold
+        self.total = len(rows)
+        if not dense.any():
+            self.drawn, self.merged, self.aggregates = self.total, 0, 0
+            return rows
+        slotOf = np.where(dense, np.cumsum(dense) - 1, -1)
+        slot = np.full(len(rows), -1, dtype=np.int64)
+        slot[onScreen] = slotOf[inverse]
+        merge = slot >= 0
+        slot, group = slot[merge], rows[merge]
+        denseKeys = keys[dense]
+        m = len(denseKeys)
+
+        # blend the merged particles per pixel ...
+        pixels, pixel = np.unique((py*width + px)[merge], return_inverse=True)
+        alpha = np.clip(group[:, 6].astype(np.float64), 0, MAX_ALPHA)
+        cover = -np.expm1(np.bincount(pixel, weights=np.log1p(-alpha)))
+        wsum = np.bincount(pixel, weights=alpha)
+        owner = np.searchsorted(denseKeys, (pixels//width//s)*self.cols + (pixels % width)//s)
+        # ... and spread the pixels evenly over their cell
+        coverSum = np.bincount(owner, weights=cover, minlength=m)
+        out = np.empty((m, PACKED), dtype=np.float32)
+        for ch in range(3):
+            csum = np.bincount(pixel, weights=group[:, 3+ch]*alpha)
+            rgb = np.divide(csum, wsum, out=np.zeros_like(csum), where=wsum > 0)
+            num = np.bincount(owner, weights=cover*rgb, minlength=m)
+            out[:, 3+ch] = np.divide(num, coverSum, out=np.zeros_like(num), where=coverSum > 0)
+        out[:, 6] = coverSum/(s*s)
+        # at the centre of the cell, at the mean depth of its particles
+        z = np.bincount(slot, weights=depth[merge], minlength=m)/counts[dense]
+        out[:, :3] = self.unproject((denseKeys % self.cols)*s + s/2, (denseKeys//self.cols)*s + s/2, z)
+
+        self.merged, self.aggregates = len(group), m
+        kept = rows[~merge]
+        self.drawn = len(kept) + m
+        return np.concatenate([kept, out])
+
+#-error-metric--------------------------------------------------------------------
+# how much merging changes a frame: renders the particles with the software
+# rasterizer as they are and after reduce(), and compares the two at the
+# scale of a cell (the images averaged over cellSize x cellSize blocks,
+# which merging is meant to keep). Returns the mean difference per channel
+# (in 0..255 steps) over the frame, the 99th percentile and largest over
+# the blocks particles cover in either render, the mean difference of single
+# pixels, and the share of particles merged away.
+def error(positions, colors, camera, width=640, height=480, cellSize=CELL_SIZE, threshold=THRESHOLD, triangles=None):
+    rows = np.empty((len(positions), PACKED), dtype=np.float32)
+    rows[:, :3], rows[:, 3:] = positions, colors
+    lod = LevelOfDetail(camera, width, height, cellSize, threshold)
+    reduced = lod.reduce(rows)
+    sizes = np.ones(len(reduced), dtype=np.int64)
+    sizes[len(reduced) - lod.aggregates:] = cellSize
+    raster = Rasterizer(width, height)
+    background = raster.render(rows[:0, :3], rows[:0, 3:], camera, triangles)
+    full = raster.render(rows[:, :3], rows[:, 3:], camera, triangles)
+    merged = raster.render(reduced[:, :3], reduced[:, 3:], camera, triangles, sizes=sizes)
+
+    # mean over cellSize blocks (the last partial row/column of blocks dropped)
+    def blocks(image):
+        h, w = height//cellSize*cellSize, width//cellSize*cellSize
+        return image[:h, :w, :3].reshape(h//cellSize, cellSize, w//cellSize, cellSize, 3).mean(axis=(1, 3))
+    bg, a, b = blocks(background), blocks(full), blocks(merged)
+    diff = np.abs(a - b)
+    covered = diff[(a != bg).any(axis=-1) | (b != bg).any(axis=-1)]
+    return {"mean": float(diff.mean()), "p99": float(np.percentile(covered, 99)) if covered.size else 0.0,
+            "max": float(diff.max(initial=0)), "pixel_mean": float(np.abs(full[..., :3].astype(np.int64) - merged[..., :3]).mean()),
+            "particles": lod.total, "drawn": lod.drawn, "ratio": lod.ratio}
@@ -0,0 +1,120 @@
+import math, os
+
+import numpy as np
+
+from genfx.engine import RADIUS
+
+# Indexed sphere meshes
+#   the planet is a subdivided octahedron (as the original scripts drew it) or
+#   icosahedron pushed out onto the sphere. Each level splits every triangle
+#   into four, sharing the new edge midpoints between neighbours, so the mesh
+#   is unique vertices plus a triangle index array. Meshes are memoized and
+#   cached on disk as .npy files, so deep meshes are only ever built once.
+
+#-constants-----------------------------------------------------------------------
+MAX_DEPTH = 4
+CACHE_DIR = os.environ.get("GENFX_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "genfx"))
+
+_meshes = {}
+
+#-base-solids---------------------------------------------------------------------
+def octahedron():
+    vertices = np.array([[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]], dtype=float)
+    px, nx, py, ny, pz, nz = range(6)
+    # same faces, in the same order, as the old subdivide() calls
+    triangles = np.array([[py, px, pz], [py, px, nz], [py, nx, pz], [py, nx, nz],
+                          [ny, px, pz], [ny, px, nz], [ny, nx, pz], [ny, nx, nz]])
+    return vertices, triangles
+
+def icosahedron():
+    t = (1 + math.sqrt(5))/2
+    vertices = np.array([[-1, t, 0], [1, t, 0], [-1, -t, 0], [1, -t, 0],
+                         [0, -1, t], [0, 1, t], [0, -1, -t], [0, 1, -t],
+                         [t, 0, -1], [t, 0, 1], [-t, 0, -1], [-t, 0, 1]], dtype=float)
+    triangles = np.array([[0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+                          [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+                          [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+                          [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]])
+    return vertices / np.linalg.norm(vertices, axis=1)[:, None], triangles
+
+BASES = {"octahedron": octahedron, "icosahedron": icosahedron}
+
+#-mesh-building-------------------------------------------------------------------
+# split every triangle (p1, p2, p3) into (p1, p13, p12), (p12, p13, p23),
+# (p12, p23, p2), (p13, p3, p23) like subdivide() did, adding each edge
+# midpoint once. Children stay next to each other, so the triangle order is
+# the same depth-first order the recursive version produced.
+def subdivide(vertices, triangles):
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [0, 2]], triangles[:, [1, 2]]])
+    edges.sort(axis=1)
+    unique, inverse = np.unique(edges, axis=0, return_inverse=True)
+    mids = len(vertices) + inverse.reshape(3, -1)
+    p12, p13, p23 = mids
+    p1, p2, p3 = triangles.T
+
+    vertices = np.concatenate([vertices, (vertices[unique[:, 0]] + vertices[unique[:, 1]])/2])
+    triangles = np.stack([np.stack([p1, p13, p12], axis=-1),
+                          np.stack([p12, p13, p23], axis=-1),
+                          np.stack([p12, p23, p2], axis=-1),
+                          np.stack([p13, p3, p23], axis=-1)], axis=1).reshape(-1, 3)
+    return vertices, triangles
+
+# build a sphere mesh of the given radius and subdivision depth
+#   returns (vertices (v, 3) float64, triangles (t, 3) int32), read-only
+#   and shared between callers
+def sphere(radius=RADIUS, depth=MAX_DEPTH, base="octahedron", cache=True):
+    key = (base, depth, float(radius))
+    if key in _meshes:
+        return _meshes[key]
+
+    mesh = loadCached(key) if cache else None
+    if mesh is None:
+        vertices, triangles = BASES[base]()
+        vertices = vertices*radius
+        for level in range(depth):
+            vertices, triangles = subdivide(vertices, triangles)
+        vertices = radius*vertices/np.linalg.norm(vertices, axis=1)[:, None]
+        mesh = (vertices, triangles.astype(np.int32))
+        if cache:
+            saveCached(key, mesh)
+
+    for arr in mesh:
+        arr.setflags(write=False)
+    _meshes[key] = mesh
+    return mesh
+
+# copy of 'vertices' with each one pushed out from the origin by 'offsets'
+# (one per vertex, negative pulls it in), for deformed planets and terrain
+def displace(vertices, offsets):
+    vertices = np.asarray(vertices, dtype=float)
+    rad = np.linalg.norm(vertices, axis=1)
+    return vertices*((rad + offsets)/rad)[:, None]
+
+# (t, 3, 3) array of triangle corners, as drawn by GL_TRIANGLES
+def triangleSoup(vertices, triangles):
+    return vertices[triangles]
+
+#-disk-cache----------------------------------------------------------------------
+def cachePaths(key):
+    base, depth, radius = key
+    stem = os.path.join(CACHE_DIR, "sphere-%s-d%d-r%r" % (base, depth, radius))
+    return stem + "-vertices.npy", stem + "-triangles.npy"
+
+def loadCached(key):
+    paths = cachePaths(key)
+    try:
+        return tuple(np.load(path) for path in paths)
+    except (OSError, ValueError):
+        return None
+
+# written to a temporary name first, so a reader never sees half a file
+def saveCached(key, mesh):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for path, arr in zip(cachePaths(key), mesh):
+            tmp = "%s.%d.tmp" % (path, os.getpid())
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+    except OSError:
+        pass # the cache is only an optimisation
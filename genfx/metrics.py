@@ -0,0 +1,150 @@
+import csv, json, time
+
+import numpy as np
+
+# Per-frame timing of each phase of the main loop
+#   phases are timed with 'with metrics.time(phase):' blocks (repeated blocks
+#   in one frame add up), and every frame becomes one row of a fixed size
+#   ring buffer along with the live particle and system counts. A disabled
+#   FrameMetrics hands out a shared no-op timer, so leaving the calls in
+#   costs next to nothing.
+#
+#   a frame starts with beginFrame() (Simulation.step calls it) and ends at
+#   the next beginFrame(), so work done on a frame after stepping it (drawing,
+#   flushing) is counted against that frame. 'wall' is the whole interval.
+#   'drawn' is how many points were sent to GL after view culling
+#   (genfx.cull) and level of detail merging (genfx.lod), and the same as
+#   'particles' when neither is used.
+
+#-constants-----------------------------------------------------------------------
+PHASES = ("spawn", "update", "cull", "draw", "flush")
+CAPACITY = 4096
+PERCENTILES = (50, 90, 99)
+
+#-timers--------------------------------------------------------------------------
+class PhaseTimer:
+    __slots__ = ("metrics", "phase", "start")
+
+    def __init__(self, metrics, phase):
+        self.metrics, self.phase = metrics, PHASES.index(phase)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics._current[self.phase] += time.perf_counter() - self.start
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_TIMER = NullTimer()
+
+#-metrics-------------------------------------------------------------------------
+class FrameMetrics:
+    def __init__(self, capacity=CAPACITY, enabled=True):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.phases = np.zeros((capacity, len(PHASES)))
+        self.wall = np.zeros(capacity)
+        self.frame = np.zeros(capacity, dtype=np.int64)
+        self.particles = np.zeros(capacity, dtype=np.int64)
+        self.systems = np.zeros(capacity, dtype=np.int64)
+        self.drawn = np.zeros(capacity, dtype=np.int64)
+        self.count = 0 # frames recorded so far (the ring keeps the last 'capacity')
+
+        self._timers = {phase: PhaseTimer(self, phase) for phase in PHASES}
+        self._current = np.zeros(len(PHASES))
+        self._open = None # (frame number, start time) of the frame being recorded
+        self._counts = (0, 0)
+        self._drawn = None
+
+    def time(self, phase):
+        return self._timers[phase] if self.enabled else NULL_TIMER
+
+    # close the frame being recorded (if any) and start recording 'frameNum'
+    def beginFrame(self, frameNum):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.endFrame(now)
+        self._open = (frameNum, now)
+
+    # live particle and system counts of the frame being recorded
+    def setCounts(self, particles, systems):
+        self._counts = (particles, systems)
+
+    # particles of the frame being recorded that were drawn after culling
+    def setDrawn(self, drawn):
+        self._drawn = drawn
+
+    def endFrame(self, now=None):
+        if self._open is None:
+            return
+        frameNum, start = self._open
+        row = self.count % self.capacity
+        self.phases[row] = self._current
+        self.wall[row] = (time.perf_counter() if now is None else now) - start
+        self.frame[row] = frameNum
+        self.particles[row], self.systems[row] = self._counts
+        self.drawn[row] = self._counts[0] if self._drawn is None else self._drawn
+        self.count += 1
+        self._current[:] = 0
+        self._open = None
+        self._drawn = None
+
+    # indices of the recorded rows, oldest first
+    def _order(self):
+        if self.count <= self.capacity:
+            return np.arange(self.count)
+        return (np.arange(self.capacity) + self.count) % self.capacity
+
+    # one dict per recorded frame, oldest first (times in milliseconds)
+    def rows(self):
+        rows = []
+        for row in self._order():
+            particles, drawn = int(self.particles[row]), int(self.drawn[row])
+            record = {"frame": int(self.frame[row]), "particles": particles, "systems": int(self.systems[row]),
+                      "drawn": drawn, "cull_ratio": 1 - drawn/particles if particles else 0.0, "wall_ms": 1000*self.wall[row]}
+            record.update({phase + "_ms": 1000*t for phase, t in zip(PHASES, self.phases[row])})
+            rows.append(record)
+        return rows
+
+    # rolling percentiles (ms) of each phase and of the frame wall time over
+    # the frames still in the ring
+    def percentiles(self, q=PERCENTILES):
+        order = self._order()
+        if len(order) == 0:
+            return {}
+        stats = {phase: np.percentile(1000*self.phases[order, ii], q).tolist() for ii, phase in enumerate(PHASES)}
+        stats["wall"] = np.percentile(1000*self.wall[order], q).tolist()
+        return {name: dict(zip(("p%d" % p for p in q), values)) for name, values in stats.items()}
+
+    def dumpJSONL(self, path):
+        self.endFrame()
+        with open(path, "w") as f:
+            for record in self.rows():
+                f.write(json.dumps(record) + "\n")
+
+    def dumpCSV(self, path):
+        self.endFrame()
+        rows = self.rows()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["frame", "particles", "systems", "drawn", "cull_ratio", "wall_ms"] + [p + "_ms" for p in PHASES])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    # .csv goes to dumpCSV, anything else to dumpJSONL
+    def dump(self, path):
+        if path.lower().endswith(".csv"):
+            self.dumpCSV(path)
+        else:
+            self.dumpJSONL(path)
+
+# shared disabled instance, the default for engines and simulations
+NO_METRICS = FrameMetrics(capacity=1, enabled=False)
@@ -0,0 +1,242 @@
+import multiprocessing, os, traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from genfx.engine import DTYPE, INITIAL_CAPACITY, ParticleBuffer
+from genfx.gldraw import PACKED
+from genfx.metrics import NO_METRICS
+from genfx.simulation import Simulation, DELTA_T
+
+# One simulation split over worker processes
+#   the spawn events of the scene are dealt out round robin (event k goes to
+#   worker k % workers), and every worker runs an ordinary Simulation that
+#   only fires its own events. Events draw from streams keyed on the event
+#   (see genfx.streams), so the workers together produce exactly the particles
+#   of a single Simulation with the same seed, only not in the same order.
+#
+#   each worker keeps its ParticleBuffer columns in one shared_memory block
+#   and integrates and culls them in place. After a step the worker only sends
+#   its particle count and block name back; the main process maps the block
+#   and copies the live positions and colors straight into its draw buffer,
+#   so no particle data is ever pickled. A worker that outgrows its block
+#   moves to a bigger one under a new name.
+#
+#   throughput grows with the number of cores for scenes whose events are
+#   similar in size (genesis' rings); a governor cannot be used (its budget
+#   is global), and neither can seek().
+
+#-shared-buffers------------------------------------------------------------------
+# (name, offset in bytes, shape, dtype) of every ParticleBuffer field in a
+# block holding 'capacity' particles, and the block size
+def layout(capacity):
+    fields, offset = [], 0
+    for name, width in ParticleBuffer.FIELDS:
+        dtype = np.dtype(np.int64 if name in ParticleBuffer.INTEGER_FIELDS else DTYPE)
+        shape = (capacity, width) if width else (capacity,)
+        fields.append((name, offset, shape, dtype))
+        offset += dtype.itemsize*int(np.prod(shape))
+        offset += -offset % 64 # keep every column cache line aligned
+    return fields, max(offset, 1)
+
+# views of the fields of 'layout(capacity)' in the buffer 'buf'
+def fieldViews(buf, capacity):
+    fields, _ = layout(capacity)
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset) for name, offset, shape, dtype in fields}
+
+# ParticleBuffer whose columns live in a shared_memory block
+class SharedParticleBuffer(ParticleBuffer):
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.block = None
+        super().__init__(capacity)
+
+    def _resize(self, capacity):
+        fields, size = layout(capacity)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        for name, view in fieldViews(block.buf, capacity).items():
+            if self.capacity:
+                view[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, view)
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+        self.block = block
+        self.capacity = capacity
+
+    # free the block (views into it must not be used afterwards)
+    def release(self):
+        if self.block is not None:
+            for name, _ in self.FIELDS:
+                setattr(self, name, None)
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+#-workers-------------------------------------------------------------------------
+# Simulation firing only spawn events 'index', 'index' + parts, ...
+class PartitionSimulation(Simulation):
+    def __init__(self, scene, dt, seed, index, parts, collider=None):
+        super().__init__(scene, dt, seed, collider=collider)
+        self.index, self.parts = index, parts
+        self.engine.particles = SharedParticleBuffer()
+
+    def spawnParticle(self):
+        if self.iteration % self.parts == self.index:
+            super().spawnParticle()
+        else:
+            skip = getattr(self.scene, "skipEvent", None)
+            if skip is not None:
+                skip(self.engine, self.iteration)
+            self.iteration += 1
+
+# worker process: steps its partition on request
+#   receives ("step", n) or ("close",), answers every step with
+#   ("ok", particles, systems, block name, capacity) or ("error", traceback)
+def work(conn, scene, dt, seed, index, parts, collider):
+    sim = None
+    try:
+        sim = PartitionSimulation(scene, dt, seed, index, parts, collider)
+        while True:
+            command = conn.recv()
+            if command[0] == "close":
+                break
+            try:
+                sim.step(command[1])
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+                continue
+            particles = sim.engine.particles
+            conn.send(("ok", len(particles), len(sim.systems), particles.block.name, particles.capacity))
+    finally:
+        if sim is not None:
+            sim.engine.particles.release()
+        conn.close()
+
+#-parallel-simulation-------------------------------------------------------------
+# Simulation of 'scene' stepped by 'workers' processes (one per core by default)
+#   steps, positions(), colors() and packed() work as for a Simulation, and it
+#   can be handed to viewer.run; close() (or a with block) stops the workers
+class ParallelSimulation:
+    governor = None
+
+    def __init__(self, scene, dt=DELTA_T, seed=None, workers=None, metrics=NO_METRICS, collider=None):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little") # the workers must share one
+        self.scene = scene
+        self.dt = dt
+        self.seed = seed
+        self.metrics = metrics
+        self.frameNum = 0
+        self.workers = []
+        context = multiprocessing.get_context()
+        # one resource tracker for all processes, so the blocks are tracked
+        # (and unlinked) once however many processes map them
+        resource_tracker.ensure_running()
+        parts = workers or os.cpu_count()
+        for index in range(parts):
+            conn, child = context.Pipe()
+            proc = context.Process(target=work, args=(child, scene, dt, seed, index, parts, collider), daemon=True)
+            proc.start()
+            child.close()
+            self.workers.append(WorkerView(proc, conn))
+        self.buffer = np.empty((0, PACKED), dtype=np.float32)
+        self.count = None # rows of the packed frame in self.buffer, None if stale
+
+    @property
+    def systems(self):
+        return range(sum(worker.systems for worker in self.workers)) # only the count is known here
+
+    def step(self, frames=1):
+        if frames <= 0:
+            return self
+        self.metrics.beginFrame(self.frameNum + frames)
+        with self.metrics.time("update"):
+            for worker in self.workers:
+                worker.conn.send(("step", frames))
+            errors = [error for error in (worker.wait() for worker in self.workers) if error]
+        if errors:
+            raise RuntimeError("simulation worker failed:\n" + errors[0])
+        self.frameNum += frames
+        self.count = None
+        self.metrics.setCounts(sum(worker.particles for worker in self.workers), len(self.systems))
+        return self
+
+    # the live particles of every worker as packed (x, y, z, r, g, b, a) rows
+    def packed(self):
+        if self.count is None:
+            n = sum(worker.particles for worker in self.workers)
+            if len(self.buffer) < n:
+                self.buffer = np.empty((max(n, 2*len(self.buffer)), PACKED), dtype=np.float32)
+            start = 0
+            for worker in self.workers:
+                if not worker.particles:
+                    continue
+                stop = start + worker.particles
+                self.buffer[start:stop, :3] = worker.fields["pos"][:worker.particles]
+                self.buffer[start:stop, 3:] = worker.fields["col"][:worker.particles]
+                start = stop
+            self.count = n
+        return self.buffer[:self.count]
+
+    def positions(self):
+        return self.packed()[:, :3]
+
+    def colors(self):
+        return self.packed()[:, 3:]
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# main process end of one worker, with its block mapped
+class WorkerView:
+    def __init__(self, proc, conn):
+        self.proc, self.conn = proc, conn
+        self.particles, self.systems = 0, 0
+        self.block, self.fields = None, None
+
+    # read the answer to a step, remapping the block if the worker moved;
+    # returns the worker's traceback if it failed
+    def wait(self):
+        try:
+            reply = self.conn.recv()
+        except EOFError:
+            return "worker %d exited" % self.proc.pid
+        if reply[0] == "error":
+            return reply[1]
+        _, self.particles, self.systems, name, capacity = reply
+        if self.block is None or self.block.name != name:
+            self.unmap()
+            self.block = attach(name)
+            self.fields = fieldViews(self.block.buf, capacity)
+        return None
+
+    def unmap(self):
+        if self.block is not None:
+            self.fields = None
+            self.block.close()
+            self.block = None
+
+    def close(self):
+        self.unmap()
+        if self.proc.is_alive():
+            try:
+                self.conn.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+            self.proc.join(5)
+            if self.proc.is_alive():
+                self.proc.terminate()
+        self.conn.close()
+
+#-helper/utility-functions--------------------------------------------------------
+# map a block a worker made (the worker also unlinks it)
+def attach(name):
+    return shared_memory.SharedMemory(name=name)
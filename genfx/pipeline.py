@@ -0,0 +1,116 @@
+import threading
+
+import numpy as np
+
+from genfx.gldraw import PACKED, pack
+
+# Pipelined simulation
+#   a worker thread steps the simulation for frame N+1 and packs its particles
+#   into a back buffer while the main thread draws frame N from the front
+#   buffer; swap() waits for the worker, exchanges the two buffers and lets
+#   the main thread hand out the next steps. The NumPy work of a step mostly
+#   runs with the GIL released, so on a multicore machine the update hides
+#   behind drawing, at the cost of showing every frame one frame later.
+#
+#   only the worker touches the simulation between start() and swap(); the
+#   main thread must only read the Frame swap() returned. Steps are taken in
+#   the same order as without the pipeline, so the frames are the same too.
+#   Phase timings of the main thread (draw, flush) end up on whichever frame
+#   the worker is recording at the time.
+
+#-frames--------------------------------------------------------------------------
+# one packed frame and the counts to show with it
+class Frame:
+    def __init__(self):
+        self.buffer = np.empty((0, PACKED), dtype=np.float32)
+        self.packed = self.buffer
+        self.frameNum = 0
+        self.systems = 0
+
+    # copy the current frame of 'sim' in (read-only rows, like a Replay's
+    # mapped file, are used in place)
+    def fill(self, sim):
+        packed = sim.packed() if hasattr(sim, "packed") else None
+        if packed is not None and not packed.flags.writeable:
+            self.packed = packed
+        else:
+            n = len(packed) if packed is not None else len(sim.positions())
+            if len(self.buffer) < n:
+                self.buffer = np.empty((max(n, 2*len(self.buffer)), PACKED), dtype=np.float32)
+            if packed is not None:
+                self.packed = self.buffer[:n]
+                self.packed[...] = packed
+            else:
+                self.packed = pack(sim.positions(), sim.colors(), self.buffer[:n])
+        self.frameNum = sim.frameNum
+        self.systems = len(sim.systems)
+
+    def __len__(self):
+        return len(self.packed)
+
+#-pipeline------------------------------------------------------------------------
+#   sim - genfx.simulation.Simulation (or genfx.recording.Replay) to step
+class Pipeline:
+    def __init__(self, sim):
+        self.sim = sim
+        self.front, self.back = Frame(), Frame()
+        self.back.fill(sim)
+        self.error = None
+        self.steps = None # steps handed to the worker, None while it idles
+        self.closed = False
+        self.ready = threading.Condition()
+        self.worker = threading.Thread(target=self.work, name="genfx-pipeline", daemon=True)
+        self.worker.start()
+
+    # have the worker take 'steps' steps and pack the frame they end on
+    def start(self, steps):
+        with self.ready:
+            if self.steps is not None:
+                raise RuntimeError("pipeline already busy, swap() first")
+            self.steps = steps
+            self.ready.notify_all()
+
+    # wait for the frame being simulated, make it the front buffer and return it
+    def swap(self):
+        with self.ready:
+            while self.steps is not None and self.error is None:
+                self.ready.wait()
+            if self.error is not None:
+                raise RuntimeError("simulation worker failed") from self.error
+            self.front, self.back = self.back, self.front
+        return self.front
+
+    def work(self):
+        while True:
+            with self.ready:
+                while self.steps is None and not self.closed:
+                    self.ready.wait()
+                if self.closed:
+                    return
+                steps = self.steps
+            try:
+                self.sim.step(steps)
+                self.back.fill(self.sim)
+            except BaseException as e:
+                with self.ready:
+                    self.error = e
+                    self.ready.notify_all()
+                return
+            with self.ready:
+                self.steps = None
+                self.ready.notify_all()
+
+    # let the worker finish its frame and stop it
+    def close(self):
+        with self.ready:
+            while self.steps is not None and self.error is None:
+                self.ready.wait()
+            self.closed = True
+            self.ready.notify_all()
+        self.worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,160 @@
+import numpy as np
+
+from genfx import mesh
+
+# Software rasterizer for rendering frames without a GL context
+#   reproduces what the viewer draws (translucent planet triangles, then
+#   alpha-blended 1 pixel, or square sized, points) into a NumPy framebuffer. Fragments are
+#   composited with scatter-adds rather than one at a time, which is exact
+#   for the single-colored planet and an order-independent approximation of
+#   GL_SRC_ALPHA/GL_ONE_MINUS_SRC_ALPHA blending for the particles.
+
+#-constants-----------------------------------------------------------------------
+MAX_ALPHA = 1 - 1e-6 # keeps log(1-alpha) finite
+CHUNK = 1 << 22 # candidate pixels tested per triangle batch
+
+#-rasterizer----------------------------------------------------------------------
+class Rasterizer:
+    def __init__(self, width=1920, height=1080, background=(0.0, 0.0, 0.0)):
+        self.width, self.height = width, height
+        self.background = np.asarray(background, dtype=np.float64)
+        self._layer = (None, None)
+
+    # (n, 3) world points -> pixel x, pixel y, ndc depth and in-front-of-camera flag
+    def project(self, points, camera):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        mat = camera.matrix(self.width/self.height)
+        clip = points @ mat[:, :3].T + mat[:, 3]
+        inFront = clip[:, 3] > 0
+        w = np.where(inFront, clip[:, 3], 1)
+        ndc = clip[:, :3] / w[:, None]
+        x = (ndc[:, 0]+1)/2*self.width
+        y = (1-ndc[:, 1])/2*self.height # row 0 is the top of the image
+        return x, y, ndc[:, 2], inFront
+
+    # render one frame as an (height, width, 4) uint8 RGBA image
+    #   positions/colors - (n, 3) and (n, 4) particle arrays
+    #   triangles        - (t, 3, 3) planet triangles (or None)
+    #   triangleColor    - RGBA of the planet, as glColor4f in the viewer
+    #   sizes            - point size in pixels of each particle (None for 1)
+    def render(self, positions, colors, camera, triangles=None, triangleColor=(1.0, 1.0, 1.0, 0.05), sizes=None):
+        layer, image = self.planetLayer(camera, triangles, triangleColor)
+        image = image.copy()
+        x, y, z, visible = self.project(positions, camera)
+        colors = np.asarray(colors)
+        if sizes is None:
+            px, py = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+            visible &= (z >= -1) & (z <= 1) & (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            px, py, colors = px[visible], py[visible], colors[visible]
+        else:
+            # like GL_POINTS with glPointSize: a point whose centre is on
+            # screen covers the size x size pixels whose centres lie within
+            # size/2 of it
+            visible &= (z >= -1) & (z <= 1) & (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+            sizes = np.asarray(sizes, dtype=np.int64)[visible]
+            area = sizes*sizes
+            point = np.repeat(np.arange(len(sizes)), area)
+            k = np.arange(len(point)) - np.repeat(np.cumsum(area) - area, area)
+            size = sizes[point]
+            px = np.floor(x[visible] - sizes/2 + 0.5).astype(np.int64)[point] + k % size
+            py = np.floor(y[visible] - sizes/2 + 0.5).astype(np.int64)[point] + k // size
+            inside = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            px, py, colors = px[inside], py[inside], colors[visible][point[inside]]
+        hit, out = composite(layer, py*self.width + px, colors[:, :3], colors[:, 3])
+        image.reshape(-1, 4)[hit] = toRGBA8(out)
+        return image
+
+    # background with the planet drawn over it, as a flat float framebuffer
+    # and as an image, cached while the camera and mesh stay the same
+    def planetLayer(self, camera, triangles, color):
+        key = (camera.key(), id(triangles), tuple(color))
+        if self._layer[0] == key:
+            return self._layer[1]
+        frame = np.empty((self.width*self.height, 3))
+        frame[:] = self.background
+        if triangles is not None:
+            self.drawTriangles(frame, np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3), camera, color)
+        self._layer = (key, (frame, toRGBA8(frame).reshape(self.height, self.width, 4)))
+        return self._layer[1]
+
+    # scan convert every triangle at once: list every pixel of every
+    # triangle's bounding box, keep those inside all three edges and inside the
+    # depth range, then composite them in one scatter
+    def drawTriangles(self, frame, triangles, camera, color):
+        x, y, z, inFront = self.project(triangles.reshape(-1, 3), camera)
+        # drop triangles with a vertex behind the camera
+        keep = inFront.reshape(-1, 3).all(axis=1)
+        x, y, z = x.reshape(-1, 3)[keep], y.reshape(-1, 3)[keep], z.reshape(-1, 3)[keep]
+        xmin = np.clip(np.floor(x.min(axis=1)), 0, self.width).astype(np.int64)
+        xmax = np.clip(np.ceil(x.max(axis=1)), 0, self.width).astype(np.int64)
+        ymin = np.clip(np.floor(y.min(axis=1)), 0, self.height).astype(np.int64)
+        ymax = np.clip(np.ceil(y.max(axis=1)), 0, self.height).astype(np.int64)
+        wx, hy = xmax - xmin, ymax - ymin
+        counts = wx*hy
+        area = (x[:, 1]-x[:, 0])*(y[:, 2]-y[:, 0]) - (x[:, 2]-x[:, 0])*(y[:, 1]-y[:, 0])
+        tris = np.flatnonzero((counts > 0) & (area != 0))
+
+        # batch triangles so the candidate arrays stay bounded
+        ends = np.cumsum(counts[tris])
+        start = 0
+        while start < len(tris):
+            stop = max(start+1, np.searchsorted(ends, ends[start] - counts[tris[start]] + CHUNK, side="right"))
+            batch = tris[start:stop]
+            start = stop
+
+            t = np.repeat(batch, counts[batch])
+            offsets = np.cumsum(counts[batch]) - counts[batch]
+            k = np.arange(len(t)) - np.repeat(offsets, counts[batch])
+            px = xmin[t] + k % wx[t]
+            py = ymin[t] + k // wx[t]
+            cx, cy = px + 0.5, py + 0.5
+
+            # barycentric coordinates of the pixel centres
+            tx, ty = x[t], y[t]
+            b0 = ((tx[:, 1]-cx)*(ty[:, 2]-cy) - (tx[:, 2]-cx)*(ty[:, 1]-cy)) / area[t]
+            b1 = ((tx[:, 2]-cx)*(ty[:, 0]-cy) - (tx[:, 0]-cx)*(ty[:, 2]-cy)) / area[t]
+            b2 = 1 - b0 - b1
+            depth = b0*z[t, 0] + b1*z[t, 1] + b2*z[t, 2]
+            inside = (b0 >= 0) & (b1 >= 0) & (b2 >= 0) & (depth >= -1) & (depth <= 1)
+
+            n = np.count_nonzero(inside)
+            hit, out = composite(frame, (py*self.width + px)[inside], np.broadcast_to(color[:3], (n, 3)), np.full(n, color[3]))
+            frame[hit] = out
+
+#-helper/utility-functions--------------------------------------------------------
+# blend fragments over a flat (pixels, 3) framebuffer
+#   each touched pixel keeps prod(1-alpha) of what was there, and the fragments
+#   contribute their alpha weighted mean color for the rest
+#   returns the touched pixel indices and their new colors
+def composite(frame, index, rgb, alpha):
+    if len(index) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+    alpha = np.clip(np.asarray(alpha, dtype=np.float64), 0, MAX_ALPHA)
+    # scatter over the touched pixels only, not the whole framebuffer
+    hit, slot = np.unique(index, return_inverse=True)
+    trans = np.exp(np.bincount(slot, weights=np.log1p(-alpha), minlength=len(hit)))
+    wsum = np.bincount(slot, weights=alpha, minlength=len(hit))
+    out = frame[hit]*trans[:, None]
+    for ch in range(3):
+        csum = np.bincount(slot, weights=rgb[:, ch]*alpha, minlength=len(hit))
+        out[:, ch] += np.divide(csum, wsum, out=np.zeros_like(csum), where=wsum > 0)*(1-trans)
+    return hit, out
+
+def toRGBA8(frame):
+    out = np.empty(frame.shape[:-1] + (4,), dtype=np.uint8)
+    out[..., :3] = np.clip(np.rint(frame*255), 0, 255)
+    out[..., 3] = 255
+    return out
+
+# (t, 3, 3) triangles of the planet drawn by the viewer
+def sphereTriangles(r, maxDepth=mesh.MAX_DEPTH):
+    return mesh.triangleSoup(*mesh.sphere(r, maxDepth))
+
+# render 'frames' frames of a Simulation, stepping it before each one
+# (as the viewer's mainLoop does), yielding RGBA images
+def renderSimulation(sim, camera, frames, width=1920, height=1080, sphere=True, maxDepth=mesh.MAX_DEPTH):
+    raster = Rasterizer(width, height)
+    triangles = sphereTriangles(sim.scene.radius, maxDepth) if sphere and sim.scene.radius else None
+    for _ in range(frames):
+        sim.step()
+        yield raster.render(sim.positions(), sim.colors(), camera, triangles)
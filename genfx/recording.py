@@ -0,0 +1,163 @@
+import argparse, os
+
+import numpy as np
+
+from genfx import scenefile
+from genfx.gldraw import PACKED, pack
+from genfx.metrics import NO_METRICS
+from genfx.scenes import SCENES
+from genfx.simulation import Simulation, TARGET_FPS
+
+# Recorded particle trajectories
+#   a recording is the packed (x, y, z, r, g, b, a) float32 rows of every
+#   frame (the layout gldraw uploads) appended to one flat file, plus an
+#   index in '<file>.index': a header with dt and the planet radius, then
+#   (frame number, first row, row count) per frame. Replay memory-maps the
+#   file, so a frame is a view straight into the page cache: re-rendering
+#   from a new camera costs only the drawing, and recordings bigger than
+#   RAM work too.
+#
+#   both files are only ever appended to, and a frame's index entry is
+#   written after its rows, so a recording cut short (a crash, Ctrl-C) still
+#   plays up to the last frame that made it to disk.
+#
+#   python -m genfx.recording genesis genesis.rec --frames 1200 --seed 1
+#   python -m genfx.render genesis.rec angle.y4m --frames 0 1200
+
+#-constants-----------------------------------------------------------------------
+INDEX_SUFFIX = ".index"
+INDEX_MAGIC = 0x67656e6678726563 # "genfxrec"
+INDEX_HEADER = 4 # int64 words: magic, dt, radius (both float64), spare
+INDEX_ROW = 3 # int64 words per frame: frame number, first row, row count
+ROW_BYTES = PACKED*4
+
+#-recording-----------------------------------------------------------------------
+# appends frames of a Simulation to 'path', indexing each as it goes
+class Recorder:
+    def __init__(self, path, dt, radius=None):
+        self.path = path
+        self.dt, self.radius = dt, radius
+        self.file = open(path, "wb")
+        self.index = open(path + INDEX_SUFFIX, "wb")
+        header = np.zeros(INDEX_HEADER, dtype=np.int64)
+        header[0] = INDEX_MAGIC
+        header[1:3].view(np.float64)[:] = dt, np.nan if radius is None else radius
+        self.index.write(header.tobytes())
+        self.index.flush()
+        self.frames = 0
+        self.rows = 0
+        self.packed = np.empty((0, PACKED), dtype=np.float32)
+
+    # append the current frame of 'sim'
+    def record(self, sim):
+        n = len(sim.positions())
+        if len(self.packed) < n:
+            self.packed = np.empty((max(n, 2*len(self.packed)), PACKED), dtype=np.float32)
+        packed = pack(sim.positions(), sim.colors(), self.packed[:n])
+        self.file.write(memoryview(packed))
+        self.file.flush() # the rows go out before the entry pointing at them
+        self.index.write(np.array([sim.frameNum, self.rows, n], dtype=np.int64).tobytes())
+        self.index.flush()
+        self.frames += 1
+        self.rows += n
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+#-replay--------------------------------------------------------------------------
+# planet of a recording, standing in for the scene a Simulation has
+class RecordedScene:
+    def __init__(self, radius):
+        self.radius = radius
+
+# A recording played back like a Simulation: step(), positions(), colors()
+#   positions and colors are views into the memory-mapped file, and packed()
+#   is the frame's rows as they go to the GPU. Frames missing from the
+#   recording (a stream recorder fell behind) show the last one before them.
+#   step() stops at the last frame, where 'finished' turns True, or with
+#   'loop' starts over from the first.
+class Replay:
+    def __init__(self, path, loop=False):
+        index = np.fromfile(path + INDEX_SUFFIX, dtype=np.int64)
+        if len(index) < INDEX_HEADER or index[0] != INDEX_MAGIC:
+            raise ValueError("%s is not a genfx recording index" % (path + INDEX_SUFFIX))
+        self.dt, radius = index[1:3].view(np.float64).tolist()
+        self.scene = RecordedScene(None if np.isnan(radius) else radius)
+        rows = os.path.getsize(path)//ROW_BYTES
+        entries = index[INDEX_HEADER:]
+        entries = entries[:len(entries) - len(entries) % INDEX_ROW].reshape(-1, INDEX_ROW)
+        entries = entries[entries[:, 1] + entries[:, 2] <= rows] # drop frames whose rows never made it
+        self.frameNums, self.offsets, self.counts = (entries[:, ii].copy() for ii in range(INDEX_ROW))
+        self.data = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, PACKED)) if rows else np.zeros((0, PACKED), dtype=np.float32)
+        self.first = int(self.frameNums[0]) if len(self.frameNums) else 0
+        self.last = int(self.frameNums[-1]) if len(self.frameNums) else self.first
+        self.loop = loop
+        self.metrics = NO_METRICS
+        self.governor = None
+        self.systems = () # a recording has no emitters
+        self.frameNum = self.first
+
+    def __len__(self):
+        return len(self.frameNums)
+
+    def seek(self, frame):
+        self.frameNum = frame
+        return self
+
+    @property
+    def finished(self):
+        return not self.loop and self.frameNum >= self.last
+
+    def step(self, frames=1):
+        frameNum = self.frameNum + frames
+        if frameNum > self.last:
+            frameNum = self.first + (frameNum - self.first) % (self.last - self.first + 1) if self.loop else self.last
+        self.metrics.beginFrame(frameNum)
+        self.frameNum = frameNum
+        return self
+
+    def packed(self):
+        ii = int(np.searchsorted(self.frameNums, self.frameNum, side="right")) - 1
+        if ii < 0 or self.frameNum > self.last:
+            raise IndexError("frame %d not recorded (have %d to %d)" % (self.frameNum, self.first, self.last if len(self) else -1))
+        start = self.offsets[ii]
+        return self.data[start:start + self.counts[ii]]
+
+    def positions(self):
+        return self.packed()[:, :3]
+
+    def colors(self):
+        return self.packed()[:, 3:]
+
+# record frames 1..frames of 'sim' to 'path'
+def recordSimulation(sim, path, frames):
+    with Recorder(path, sim.dt, sim.scene.radius) as recorder:
+        for _ in range(frames):
+            sim.step()
+            recorder.record(sim)
+    return path
+
+#-command-line--------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m genfx.recording", description="Simulate a scene once and record every frame for replay.")
+    parser.add_argument("scene", help="one of %s, or a .toml/.json scene file" % ", ".join(sorted(SCENES)))
+    parser.add_argument("output", help="recording to write (plus OUTPUT%s)" % INDEX_SUFFIX)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=TARGET_FPS)
+    args = parser.parse_args(argv)
+
+    scene = SCENES[args.scene]() if args.scene in SCENES else scenefile.load(args.scene)
+    recordSimulation(Simulation(scene, 1/args.fps, args.seed), args.output, args.frames)
+
+if __name__ == "__main__":
+    main()
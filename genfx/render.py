@@ -0,0 +1,96 @@
+import argparse, os, shutil, tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from genfx.camera import Camera, PixelCamera
+from genfx.framewriter import FrameWriter
+from genfx.raster import renderSimulation
+from genfx.recording import Replay
+from genfx import scenefile
+from genfx.scenes import SCENES
+from genfx.simulation import Simulation, DELTA_T, TARGET_FPS
+
+# Offline rendering of a frame range, split over worker processes
+#   the range is cut into one contiguous shard per worker. Each worker starts
+#   an empty simulation warmup() steps before its shard (Simulation.startAt),
+#   renders the shard with the software rasterizer into a temporary raw file,
+#   and the shards are streamed into the output in order. Every random number
+#   comes from a stream keyed on the spawn event that needed it, so the output
+#   is identical whatever the number of workers.
+#
+#   frame k is the image the viewer shows on its (k+1)th tick
+
+#-rendering-----------------------------------------------------------------------
+# render frames [start, stop) of 'scene' to the raw RGBA file 'path'
+#   scene may also be the path of a recording (see genfx.recording), which
+#   is replayed instead of simulated
+def renderShard(scene, seed, start, stop, camera, width, height, path, dt=DELTA_T):
+    if isinstance(scene, str):
+        sim = Replay(scene).seek(start)
+        if stop > sim.last: # frame k shows recorded frame k+1
+            raise ValueError("%s ends at frame %d, cannot render up to %d" % (scene, sim.last - 1, stop))
+    else:
+        sim = Simulation(scene, dt, seed)
+        sim.startAt(max(0, start - sim.warmup()))
+        sim.step(start - sim.frameNum)
+    with FrameWriter(path, width, height, format="raw") as writer:
+        for frame in renderSimulation(sim, camera, stop - start, width, height):
+            writer.write(frame)
+    return path
+
+# render frames [start, stop) of 'scene' to 'output' (see genfx.framewriter)
+#   workers - number of processes (None for one per core)
+def renderFrames(scene, output, start, stop, camera, seed=0, width=1920, height=1080, workers=None, dt=DELTA_T, fps=TARGET_FPS):
+    workers = max(1, min(workers or os.cpu_count(), stop - start))
+    bounds = np.unique(np.linspace(start, stop, workers+1).round().astype(int))
+    shards = list(zip(bounds[:-1], bounds[1:]))
+
+    tmpdir = tempfile.mkdtemp(prefix="genfx-", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        with FrameWriter(output, width, height, fps) as writer:
+            def stitch(path):
+                frames = np.memmap(path, dtype=np.uint8, mode="r").reshape(-1, height, width, 4)
+                for frame in frames:
+                    writer.write(np.array(frame))
+                del frames
+                os.remove(path)
+
+            jobs = [(scene, seed, a, b, camera, width, height, os.path.join(tmpdir, "%d.rgba" % a), dt) for a, b in shards]
+            if workers == 1:
+                for job in jobs:
+                    stitch(renderShard(*job))
+            else:
+                with ProcessPoolExecutor(workers) as pool:
+                    for future in [pool.submit(renderShard, *job) for job in jobs]:
+                        stitch(future.result())
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+#-command-line--------------------------------------------------------------------
+# python -m genfx.render genesis angle.y4m --frames 0 1200 --workers 8
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m genfx.render", description="Render a scene offline, without a display.")
+    parser.add_argument("scene", help="one of %s, a .toml/.json scene file (see genfx.scenefile) or a recording (see genfx.recording)" % ", ".join(sorted(SCENES)))
+    parser.add_argument("output", help="output file: .y4m, .rgba (raw) or a PNG pattern such as 'angle/%%d.png'")
+    parser.add_argument("--frames", nargs=2, type=int, default=(0, 240), metavar=("START", "STOP"))
+    parser.add_argument("--size", default="1920x1080", help="WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fps", type=float, default=TARGET_FPS)
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    if args.scene in SCENES:
+        scene = SCENES[args.scene]() if args.scene != "fireworks" else SCENES[args.scene](width, height)
+    elif args.scene.endswith(scenefile.EXTENSIONS):
+        scene = scenefile.load(args.scene)
+    else:
+        scene = os.path.abspath(args.scene) # a recording, opened by each worker
+    radius = Replay(scene).scene.radius if isinstance(scene, str) else scene.radius
+    camera = Camera() if radius else PixelCamera(width, height)
+    renderFrames(scene, args.output, *args.frames, camera, seed=args.seed, width=width, height=height,
+                 workers=args.workers, dt=1/args.fps, fps=args.fps)
+
+if __name__ == "__main__":
+    main()
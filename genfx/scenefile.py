@@ -0,0 +1,213 @@
+import heapq, json, math, os, weakref
+
+import numpy as np
+
+from genfx.engine import RADIUS, SurfaceSystem, FireworkSystem, surfaceRing
+from genfx.gradient import Gradient, NAMED
+
+# Scenes described by data files
+#   a scene file (TOML or JSON) gives the planet, the spawn interval and a
+#   list of spawn entries, each of which adds emitters on a range of spawn
+#   events. Loading compiles the entries into a Timeline, a heap of
+#   (event, entry) pairs, so a spawn event pops exactly the entries due on it
+#   (O(log n) each) instead of testing every entry's range. Each engine the
+#   scene spawns into gets a Timeline of its own, so a seek or closed form
+#   rebuild never moves a running simulation's queue. A FileScene is a
+#   scene like the ones in genfx.scenes and takes random numbers from the
+#   engine in the same order, so genfx/data/genesis.toml gives the same
+#   frames as GenesisScene.
+#
+#   radius         = 25      planet radius (leave out for no planet)
+#   spawn_interval = 0.25    seconds between spawn events
+#   cycle          = 200     events repeat every this many events (optional)
+#   max_lifespan   = 3       (optional, worked out from the entries)
+#
+#   [[spawn]]                one entry, in the order they are added
+#   type   = "ring"          "ring", "emitters" or "firework"
+#   events = [0, 100]        events [first, last) (within the cycle) ...
+#   every  = 1               ... taking every n-th one
+#
+#   ring:     x (number, list indexed by event, or {linspace = [a, b, n]}),
+#             density, life_mean, life_var, start_color, end_color and
+#             optionally speed, var, spawnrad (see engine.surfaceRing)
+#   emitters: positions, start_color, end_color, lifespan and optionally
+#             speed, var, spawnrad (see engine.SurfaceSystem.many)
+#   firework: position, start_color, end_color, lifespan
+#
+#   instead of start_color and end_color, any entry can give a gradient
+#   (see genfx.gradient): the name of a built in one (gradient = "fire") or
+#   gradient = { stops = [[0, [1, 1, 0.5, 1]], [0.3, [1, 0.4, 0, 0.8]], ...],
+#                easing = "smooth" }
+
+#-constants-----------------------------------------------------------------------
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+EXTENSIONS = (".toml", ".json")
+SYSTEM_KEYS = ("speed", "var", "spawnrad")
+
+#-spawn-entries-------------------------------------------------------------------
+# ring of surface emitters around a slice of the planet (genesis.py)
+class RingSpawn:
+    def __init__(self, entry, radius):
+        self.radius = entry.get("radius", radius)
+        self.x = entry["x"]
+        if isinstance(self.x, dict):
+            self.x = np.linspace(*self.x["linspace"]).tolist()
+        self.density = entry.get("density", 1)
+        self.startColor, self.endColor = entryColors(entry)
+        self.lifeMean, self.lifeVar = entry["life_mean"], entry["life_var"]
+        self.kwargs = {key: entry[key] for key in SYSTEM_KEYS if key in entry}
+        self.maxLifespan = self.lifeMean + self.lifeVar
+
+    def __call__(self, engine, event):
+        x = self.x[event] if isinstance(self.x, list) else self.x
+        minRad = math.sqrt( self.radius**2 - x**2 )
+        engine.addSystems( surfaceRing(x, self.radius, round(self.density*minRad), engine.rng, self.startColor, self.endColor,
+                                       self.lifeMean, self.lifeVar, **self.kwargs) )
+
+# surface emitters at fixed positions
+class EmitterSpawn:
+    def __init__(self, entry, radius):
+        self.positions = entry["positions"]
+        self.startColor, self.endColor = entryColors(entry)
+        self.lifespan = entry["lifespan"]
+        self.kwargs = {key: entry[key] for key in SYSTEM_KEYS if key in entry}
+        self.maxLifespan = self.lifespan
+
+    def __call__(self, engine, event):
+        engine.addSystems( SurfaceSystem.many(self.positions, self.startColor, self.endColor, lifespans=self.lifespan, **self.kwargs) )
+
+class FireworkSpawn:
+    def __init__(self, entry, radius):
+        self.position = entry["position"]
+        self.startColor, self.endColor = entryColors(entry)
+        self.lifespan = entry.get("lifespan", 3)
+        self.maxLifespan = self.lifespan
+
+    def __call__(self, engine, event):
+        engine.addSystem( FireworkSystem(self.position, self.startColor, self.endColor, self.lifespan) )
+
+SPAWNS = {"ring": RingSpawn, "emitters": EmitterSpawn, "firework": FireworkSpawn}
+
+# (startColor, endColor) of an entry, (Gradient, None) if it gives a gradient
+def entryColors(entry):
+    if "gradient" not in entry:
+        return entry["start_color"], entry["end_color"]
+    gradient = entry["gradient"]
+    if isinstance(gradient, str):
+        if gradient not in NAMED:
+            raise ValueError("unknown gradient %r (built in: %s)" % (gradient, ", ".join(NAMED)))
+        return NAMED[gradient], None
+    return Gradient(gradient["stops"], gradient.get("easing", "linear")), None
+
+#-timeline------------------------------------------------------------------------
+# Event queue of (event, order, entry) triples, repeating every 'cycle' events
+#   schedule - [(event within the cycle, entry index)] in the order the
+#              entries must run when they share an event
+#   cycle    - None for a one-off timeline
+#   event    - first event the queue is positioned at
+class Timeline:
+    def __init__(self, schedule, cycle=None, event=0):
+        self.schedule = list(schedule)
+        self.cycle = cycle
+        self.reset(event)
+
+    # position the queue at 'event'
+    def reset(self, event):
+        self.heap = []
+        base = event - event % self.cycle if self.cycle else 0
+        for order, (at, entry) in enumerate(self.schedule):
+            at += base
+            if at < event:
+                if not self.cycle:
+                    continue
+                at += self.cycle
+            self.heap.append((at, order, entry))
+        heapq.heapify(self.heap)
+        self.next = event
+
+    # entries due on 'event', in order; events are normally asked for one
+    # after the other, anything else repositions the queue first
+    def due(self, event):
+        if event != self.next:
+            self.reset(event)
+        entries = []
+        while self.heap and self.heap[0][0] <= event:
+            at, order, entry = heapq.heappop(self.heap)
+            entries.append(entry)
+            if self.cycle:
+                heapq.heappush(self.heap, (at + self.cycle, order, entry))
+        self.next = event + 1
+        return entries
+
+    def __len__(self):
+        return len(self.heap)
+
+#-scene---------------------------------------------------------------------------
+class FileScene:
+    def __init__(self, spec, name=None):
+        self.name = name or spec.get("name", "scene")
+        self.radius = spec.get("radius")
+        self.spawnInterval = spec.get("spawn_interval", 0.25)
+        self.cycle = spec.get("cycle")
+        self.entries, schedule = [], []
+        for entry in spec.get("spawn", []):
+            if entry["type"] not in SPAWNS:
+                raise ValueError("%s: unknown spawn type %r" % (self.name, entry["type"]))
+            first, last = entry["events"]
+            for event in range(first, last, entry.get("every", 1)):
+                schedule.append((event, len(self.entries)))
+            self.entries.append(SPAWNS[entry["type"]](entry, self.radius if self.radius is not None else RADIUS))
+        schedule.sort(key=lambda item: item[0]) # stable: entries sharing an event keep file order
+        self.schedule = schedule
+        self.timelines = weakref.WeakKeyDictionary() # engine -> its Timeline
+        self.maxLifespan = spec.get("max_lifespan", max((entry.maxLifespan for entry in self.entries), default=0))
+
+    # the queue of spawn events for 'engine', made at its first 'event'
+    def timeline(self, engine, event=0):
+        timeline = self.timelines.get(engine)
+        if timeline is None:
+            timeline = self.timelines[engine] = Timeline(self.schedule, self.cycle, event)
+        return timeline
+
+    def spawnParticle(self, engine, iteration):
+        event = iteration % self.cycle if self.cycle else iteration
+        for entry in self.timeline(engine, iteration).due(iteration):
+            self.entries[entry](engine, event)
+
+    # step 'engine's queue past 'iteration' without firing it (a partition of
+    # genfx.parallel), so the next event does not reposition the queue
+    def skipEvent(self, engine, iteration):
+        self.timeline(engine, iteration).due(iteration)
+
+    # pickled (snapshots, worker processes) without the engines' queues
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["timelines"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.timelines = weakref.WeakKeyDictionary()
+
+#-loading-------------------------------------------------------------------------
+# FileScene from a .toml/.json path, or the name of a file in genfx/data
+def load(path):
+    if not os.path.exists(path):
+        for ext in EXTENSIONS:
+            builtin = os.path.join(DATA_DIR, path + ext)
+            if os.path.exists(builtin):
+                path = builtin
+                break
+        else:
+            raise FileNotFoundError("no scene file %r (built in: %s)" % (path, ", ".join(builtins())))
+    name = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".toml"):
+        import tomllib # Python 3.11+, JSON scene files work without it
+        with open(path, "rb") as f:
+            return FileScene(tomllib.load(f), name)
+    with open(path) as f:
+        return FileScene(json.load(f), name)
+
+# names of the scene files shipped in genfx/data
+def builtins():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(DATA_DIR) if name.endswith(EXTENSIONS))
@@ -0,0 +1,78 @@
+import math
+
+import numpy as np
+
+from genfx.engine import RADIUS, SurfaceSystem, FireworkSystem, surfaceRing
+from genfx.gradient import FIRE
+
+# A scene is the spawn choreography of one of the original scripts
+#   radius        - planet radius for the kill rule (None for no planet)
+#   spawnInterval - simulated seconds between calls to spawnParticle
+#   maxLifespan   - longest lifespan of any system the scene creates
+#   spawnParticle(engine, iteration) adds the systems for one spawn event,
+#   taking any random numbers from engine.rng
+#   skipEvent(engine, iteration) (optional) steps past an event without
+#   firing it, for scenes that keep per-engine state (genfx.scenefile)
+
+#-genesis.py----------------------------------------------------------------------
+# Sweeps a ring of surface emitters along the x axis, one diameter slice per
+# spawn event, then waits for the same number of events before repeating
+#   gradient - color ramp of the emitters and their particles
+class GenesisScene:
+    spawnInterval = 0.25
+
+    def __init__(self, r=RADIUS, slices=100, density=0.9, lifeMean=2, lifeVar=1, gradient=FIRE):
+        self.radius = r
+        self.gradient = gradient
+        self.diameter = np.linspace(-r, r, slices)
+        self.density = density
+        self.lifeMean, self.lifeVar = lifeMean, lifeVar
+        self.maxLifespan = lifeMean + lifeVar
+
+    def spawnParticle(self, engine, iteration):
+        iteration %= 2*len(self.diameter)
+        if iteration < len(self.diameter):
+            # one ring of emitters around this diameter slice
+            x = self.diameter[iteration]
+            minRad = math.sqrt( self.radius**2 - x**2 )
+            engine.addSystems( surfaceRing(x, self.radius, round(self.density*minRad), engine.rng, self.gradient, None, self.lifeMean, self.lifeVar) )
+
+#-explosion.py--------------------------------------------------------------------
+# A fast jet from the -x pole followed by a few tightly packed rings around it
+class ExplosionScene:
+    spawnInterval = 0.25
+
+    def __init__(self, r=RADIUS, density=1, lifeMean=2, lifeVar=1):
+        self.radius = r
+        self.diameter = np.linspace(-r, -r+0.25, 20)
+        self.density = density
+        self.lifeMean, self.lifeVar = lifeMean, lifeVar
+        self.maxLifespan = max(2*lifeMean, lifeMean + lifeVar)
+
+    def spawnParticle(self, engine, iteration):
+        r = self.radius
+        iteration %= 200
+
+        if 4<iteration < 10:
+            engine.addSystems( SurfaceSystem.many([[-r, 0, 0]]*2, [1.0, 0.75, 0.01, 1.0], [1.0, 0.5, 0.1, 0.3], lifespans=2*self.lifeMean, speed=80, var=20, spawnrad=0.01) )
+
+        if 6<iteration < 20:
+            # one ring of emitters around this diameter slice
+            x = self.diameter[iteration]
+            minRad = math.sqrt( r**2 - x**2 )
+            engine.addSystems( surfaceRing(x, r, round(self.density*minRad), engine.rng, [1.0, 0.65, 0.05, 0.75], [1.0, 0.0, 0.1, 0.1], self.lifeMean, self.lifeVar, spawnrad=0.05) )
+
+#-fireworks.py--------------------------------------------------------------------
+# One firework in the middle of an 800x600 (pixel coordinate) window
+class FireworksScene:
+    spawnInterval = 2
+    radius = None
+    maxLifespan = 3
+
+    def __init__(self, width=800, height=600):
+        self.width, self.height = width, height
+
+    def spawnParticle(self, engine, iteration):
+        engine.addSystem( FireworkSystem([self.width/2, self.height/2, 0], [0.2, 0.9, 0.1, 0.9], [0.0, 0.2, 1.0, 0.3]) )
+
+SCENES = {"genesis": GenesisScene, "explosion": ExplosionScene, "fireworks": FireworksScene}
@@ -0,0 +1,58 @@
+from genfx.simulation import EPSILON
+
+# Fixed timestep scheduler
+#   the simulation only ever moves in whole steps of sim.dt (spawn events
+#   included, see Simulation.step), whatever the render clock does. Elapsed
+#   wall time goes into an accumulator and is paid out as whole steps, so a
+#   slow frame is followed by extra steps instead of a longer one, and the
+#   particles come out the same as an offline render of the same step count.
+#
+#   at most 'maxSteps' steps are taken per frame. Anything still owed after
+#   that is dropped (the simulation falls behind the wall clock rather than
+#   spending ever longer catching up), and the dropped steps are counted.
+
+#-constants-----------------------------------------------------------------------
+MAX_STEPS = 4 # catch-up steps per rendered frame
+
+#-scheduler-----------------------------------------------------------------------
+#   sim      - genfx.simulation.Simulation to drive
+#   maxSteps - most steps taken by one advance()
+class Scheduler:
+    def __init__(self, sim, maxSteps=MAX_STEPS):
+        self.sim = sim
+        self.maxSteps = maxSteps
+        self.accumulator = 0.0 # wall seconds not yet simulated
+        self.steps = 0 # steps taken
+        self.dropped = 0 # steps skipped under overload
+        self.frames = 0 # advance()/due() calls
+
+    # account for 'elapsed' wall seconds and take the steps now due
+    #   returns the number of steps taken this call
+    def advance(self, elapsed):
+        steps = self.due(elapsed)
+        self.sim.step(steps)
+        return steps
+
+    # account for 'elapsed' wall seconds and return the steps now due without
+    # taking them (genfx.pipeline takes them on its worker thread)
+    def due(self, elapsed):
+        dt = self.sim.dt
+        self.accumulator += elapsed
+        due = int((self.accumulator + EPSILON*dt)//dt)
+        steps = min(due, self.maxSteps)
+        if due > steps:
+            self.dropped += due - steps
+        self.accumulator = max(0.0, self.accumulator - due*dt)
+        self.steps += steps
+        self.frames += 1
+        return steps
+
+    # fraction of a step owed after the last advance(), in [0, 1)
+    @property
+    def alpha(self):
+        return self.accumulator/self.sim.dt
+
+    # how far (in seconds) the simulation has fallen behind the wall clock
+    @property
+    def lag(self):
+        return self.dropped*self.sim.dt
@@ -0,0 +1,123 @@
+import math, time
+
+from genfx import closedform
+from genfx.engine import ParticleEngine
+from genfx.metrics import NO_METRICS
+from genfx.streams import Stream
+
+#-simulation-constants------------------------------------------------------------
+TARGET_FPS = 24
+DELTA_T = 1/TARGET_FPS
+EPSILON = 1e-9 # slack when comparing spawn times against simulated time
+
+#-simulation----------------------------------------------------------------------
+# Headless simulation of one scene: no window, no GL, no pyglet
+#   the update half of the old mainLoop, plus the spawnParticle timer, which
+#   now runs on simulated time instead of a pyglet clock
+#   scene - see genfx.scenes
+#   dt    - simulated seconds per frame
+#   seed  - seed of every random stream in the run (None for a random one);
+#           each spawn event draws from its own stream, and so does every
+#           system it creates, so the same seed always gives the same frames
+#   metrics - genfx.metrics.FrameMetrics recording every step
+#   collider - genfx.collide.MeshCollider to kill particles on instead of the
+#              scene's sphere of scene.radius
+#   governor - genfx.governor.Governor holding the particle count (and step
+#              time) under budget; it sees the result of every step
+class Simulation:
+    def __init__(self, scene, dt=DELTA_T, seed=None, metrics=NO_METRICS, collider=None, governor=None):
+        self.scene = scene
+        self.dt = dt
+        self.stream = Stream(seed)
+        self.governor = governor
+        radius = scene.radius if collider is None else None
+        self.engine = ParticleEngine(radius=radius, rng=self.stream.child("engine"), metrics=metrics, collider=collider, governor=governor)
+        self.frameNum = 0
+        self.iteration = 0
+
+    # the engine's metrics, so both can be swapped at once
+    @property
+    def metrics(self):
+        return self.engine.metrics
+
+    @metrics.setter
+    def metrics(self, metrics):
+        self.engine.metrics = metrics
+
+    @property
+    def systems(self):
+        return self.engine.systems
+
+    @property
+    def time(self):
+        return self.frameNum*self.dt
+
+    # run one spawn event of the scene
+    def spawnParticle(self):
+        self.engine.rng = self.stream.child("event", self.iteration)
+        self.scene.spawnParticle(self.engine, self.iteration)
+        self.iteration += 1
+
+    # number of spawn events that have fired before step number 'frame'
+    def eventsBefore(self, frame):
+        if frame <= 0:
+            return 0
+        return max(0, math.floor(((frame-1)*self.dt + EPSILON)/self.scene.spawnInterval))
+
+    # the step (counting from 1) that spawn event 'k' fires in
+    def eventStep(self, k):
+        due = lambda step: (k+1)*self.scene.spawnInterval <= (step-1)*self.dt + EPSILON
+        step = max(1, math.ceil(((k+1)*self.scene.spawnInterval - EPSILON)/self.dt) + 1)
+        while not due(step):
+            step += 1
+        while step > 1 and due(step-1):
+            step -= 1
+        return step
+
+    # move the clock of an empty simulation to 'frame' without simulating,
+    # so it continues exactly as a full run would for every system created
+    # from then on (see genfx.render)
+    def startAt(self, frame):
+        if self.systems or len(self.engine.particles):
+            raise RuntimeError("startAt() needs an empty simulation")
+        self.frameNum = frame
+        self.iteration = self.eventsBefore(frame)
+        return self
+
+    # jump straight to the state after 'frame' steps, evaluating the live
+    # particles in closed form instead of stepping (see genfx.closedform)
+    def seek(self, frame):
+        if self.engine.collider is not None:
+            raise ValueError("seek() only supports the sphere planet, not a mesh collider")
+        if self.governor is not None:
+            raise ValueError("seek() cannot replay the spawns a governor throttled")
+        return closedform.seek(self, frame)
+
+    # steps needed before a frame for it to come out the same as in a full run:
+    # anything alive then was created at most this long before
+    def warmup(self):
+        return math.ceil(self.scene.maxLifespan/self.dt) + 1
+
+    # advance the simulation by 'frames' steps of dt
+    #   spawn events fire every scene.spawnInterval simulated seconds, the
+    #   first one after one full interval (as pyglet.clock.schedule_interval)
+    def step(self, frames=1):
+        for _ in range(frames):
+            start = time.perf_counter()
+            self.metrics.beginFrame(self.frameNum+1)
+            with self.metrics.time("spawn"):
+                while (self.iteration+1)*self.scene.spawnInterval <= self.time + EPSILON:
+                    self.spawnParticle()
+            self.engine.update(self.dt)
+            self.frameNum += 1
+            self.metrics.setCounts(len(self.engine.particles), len(self.systems))
+            if self.governor is not None:
+                self.governor.observe(self.frameNum, len(self.engine.particles), time.perf_counter() - start)
+        return self
+
+    # views of the live particles, ready for drawing
+    def positions(self):
+        return self.engine.positions()
+
+    def colors(self):
+        return self.engine.colors()
@@ -0,0 +1,109 @@
+import pickle
+
+import numpy as np
+
+from genfx.engine import ParticleBuffer, SurfaceSystem, FireworkSystem, INITIAL_CAPACITY
+from genfx.gradient import GRADIENTS
+from genfx.simulation import Simulation
+from genfx.streams import Stream
+
+# Snapshots of a whole simulation
+#   save() writes everything a Simulation needs to carry on exactly where it
+#   stopped into one uncompressed .npz: the live particles as the buffer's
+#   own float32 columns, every system's state as one array per attribute and
+#   kind, the random stream states (key, counter, children) of the run, the
+#   engine and every system, the clocks (frameNum, iteration and the
+#   registry's, which systems' ages are taken from) and the color
+#   gradients in use (gradient ids differ between processes, so they are
+#   looked up again on loading). Loading is a handful of array copies, so
+#   even a few hundred thousand particles come back in milliseconds, and the
+#   restored run steps on to the same frames.
+#
+#   the scene and gradients are stored pickled, so only load snapshots you
+#   trust (or pass the scene in). Metrics, colliders and governors are not
+#   saved; give them to load() again.
+
+#-constants-----------------------------------------------------------------------
+VERSION = 3
+KINDS = {kind.__name__: kind for kind in (SurfaceSystem, FireworkSystem)}
+
+#-saving--------------------------------------------------------------------------
+def save(sim, path, compress=False):
+    engine, particles = sim.engine, sim.engine.particles
+    n = len(particles)
+    arrays = {"version": np.int64(VERSION),
+              "clock": np.array([sim.frameNum, sim.iteration, engine.nextId], dtype=np.int64),
+              "dt": np.float64(sim.dt),
+              "registryClock": np.float64(engine.registry.clock),
+              "streams": streamStates([sim.stream, engine.rng]),
+              "scene": np.frombuffer(pickle.dumps(sim.scene), dtype=np.uint8),
+              "gradients": np.frombuffer(pickle.dumps(GRADIENTS.gradients), dtype=np.uint8)}
+    for name, _ in ParticleBuffer.FIELDS:
+        arrays["particles/" + name] = getattr(particles, name)[:n]
+
+    # systems are stored grouped by kind, 'order' puts them back in list order
+    kinds = sorted({type(sys).__name__ for sys in engine.systems})
+    arrays["kinds"] = np.array(kinds)
+    arrays["order"] = np.array([kinds.index(type(sys).__name__) for sys in engine.systems], dtype=np.int64)
+    for kind in kinds:
+        group = [sys for sys in engine.systems if type(sys).__name__ == kind]
+        for name in KINDS[kind].STATE:
+            arrays["systems/%s/%s" % (kind, name)] = np.array([getattr(sys, name) for sys in group])
+        arrays["systems/%s/rng" % kind] = streamStates([sys.rng for sys in group])
+
+    with open(path, "wb") as f:
+        (np.savez_compressed if compress else np.savez)(f, **arrays)
+
+#-loading-------------------------------------------------------------------------
+# Simulation saved in 'path'; 'scene' (and the other arguments) as for
+# Simulation, scene None for the one stored in the snapshot
+def load(path, scene=None, **kwargs):
+    with np.load(path) as data:
+        if int(data["version"]) != VERSION:
+            raise ValueError("%s: snapshot version %d, expected %d" % (path, int(data["version"]), VERSION))
+        if scene is None:
+            scene = pickle.loads(data["scene"].tobytes())
+        sim = Simulation(scene, float(data["dt"]), seed=0, **kwargs)
+        engine = sim.engine
+        sim.frameNum, sim.iteration, engine.nextId = data["clock"].tolist()
+        sim.stream, engine.rng = toStreams(data["streams"])
+        # saved gradient ids to the ones of this process
+        grads = np.array([GRADIENTS.id(gradient) for gradient in pickle.loads(data["gradients"].tobytes())], dtype=np.int64)
+
+        n = len(data["particles/pos"])
+        particles = engine.particles = ParticleBuffer(max(n, INITIAL_CAPACITY))
+        for name, _ in ParticleBuffer.FIELDS:
+            getattr(particles, name)[:n] = data["particles/" + name]
+        particles.grad[:n] = grads[particles.grad[:n]]
+        particles.count = n
+
+        groups = {}
+        for kind in data["kinds"].tolist():
+            cls = KINDS[kind]
+            # scalars back to Python numbers, vectors to rows of one array each
+            state = {}
+            for name in cls.STATE:
+                values = data["systems/%s/%s" % (kind, name)]
+                if name == "grad":
+                    values = grads[values]
+                state[name] = list(values) if values.ndim > 1 else values.tolist()
+            group = []
+            for ii, rng in enumerate(toStreams(data["systems/%s/rng" % kind])):
+                sys = cls.__new__(cls)
+                for name, values in state.items():
+                    setattr(sys, name, values[ii])
+                sys.rng = rng
+                group.append(sys)
+            groups[kind] = iter(group)
+        kinds = data["kinds"].tolist()
+        engine.registry.clock = float(data["registryClock"])
+        engine.systems = [next(groups[kinds[k]]) for k in data["order"].tolist()]
+    return sim
+
+#-helper/utility-functions--------------------------------------------------------
+# (n, 3) uint64 array of (key, counter, children) per stream
+def streamStates(streams):
+    return np.array([(stream.key, stream.counter, stream.children) for stream in streams], dtype=np.uint64).reshape(-1, 3)
+
+def toStreams(states):
+    return [Stream.fromKey(*row) for row in states.tolist()]
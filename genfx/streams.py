@@ -0,0 +1,91 @@
+import hashlib, secrets
+
+import numpy as np
+
+# Counter-based random streams
+#   draw number c of a stream is a hash of (stream key, c), so a stream never
+#   depends on how many other streams exist or in which order they are used.
+#   Every emitter gets its own stream keyed on the spawn event that created
+#   it, which makes a run reproducible from its seed and lets any frame range
+#   be simulated on its own (see genfx.render).
+
+#-constants-----------------------------------------------------------------------
+MASK = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+MIX1, MIX2 = 0xBF58476D1CE4E5B9, 0x94D049BB133111EB
+TO_UNIT = 2.0**-53
+
+#-stream--------------------------------------------------------------------------
+# Stream(seed, *path) - stream for 'path' (ints/strings) under 'seed'
+#   seed None picks a random seed
+class Stream:
+    def __init__(self, seed=None, *path):
+        if seed is None:
+            seed = secrets.randbits(64)
+        self.key = deriveKey(seed, *path)
+        self.counter = 0 # draws taken so far
+        self.children = 0 # streams handed out by spawn()
+
+    @classmethod
+    def fromKey(cls, key, counter=0, children=0):
+        stream = cls.__new__(cls)
+        stream.key, stream.counter, stream.children = key, counter, children
+        return stream
+
+    # uniform floats in [0, 1), shaped like numpy's 'size'
+    def random(self, size=None):
+        n = 1 if size is None else int(np.prod(size))
+        u = uniforms(np.uint64(self.key), self.counter + np.arange(n, dtype=np.uint64))
+        self.counter += n
+        return u[0] if size is None else u.reshape(size)
+
+    # same signature as numpy.random.Generator.uniform
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return low + (high-low)*self.random(size)
+
+    # next independent child stream (e.g. one per emitter created by an event)
+    def spawn(self):
+        child = Stream.fromKey(deriveKey(self.key, self.children))
+        self.children += 1
+        return child
+
+    # child stream named by 'path', does not count towards spawn()
+    def child(self, *path):
+        return Stream(self.key, *path)
+
+#-helper/utility-functions--------------------------------------------------------
+# splitmix64 finaliser on uint64 arrays (wraps on overflow, as intended)
+def mix(z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX2)
+    return z ^ (z >> np.uint64(31))
+
+# float64 in [0, 1) for each (key, counter) pair, keys/counters broadcast
+def uniforms(keys, counters):
+    with np.errstate(over="ignore"):
+        z = mix(np.asarray(keys, dtype=np.uint64) + (np.asarray(counters, dtype=np.uint64) + np.uint64(1))*np.uint64(GOLDEN))
+    return (z >> np.uint64(11)).astype(np.float64) * TO_UNIT
+
+# 'n' uniform floats from each of 'streams', as an (len(streams), n) array
+#   equivalent to [stream.random(n) for stream in streams], in one draw
+def uniformBatch(streams, n):
+    keys = np.array([stream.key for stream in streams], dtype=np.uint64)
+    counters = np.array([stream.counter for stream in streams], dtype=np.uint64)
+    u = uniforms(keys[:, None], counters[:, None] + np.arange(n, dtype=np.uint64))
+    for stream in streams:
+        stream.counter += n
+    return u
+
+def mixInt(z):
+    z = ((z ^ (z >> 30)) * MIX1) & MASK
+    z = ((z ^ (z >> 27)) * MIX2) & MASK
+    return z ^ (z >> 31)
+
+# 64 bit key from a seed and a path of ints/strings
+def deriveKey(seed, *path):
+    key = mixInt((seed + GOLDEN) & MASK)
+    for part in path:
+        if isinstance(part, str):
+            part = int.from_bytes(hashlib.blake2b(part.encode(), digest_size=8).digest(), "little")
+        key = mixInt(((key ^ (part & MASK)) + GOLDEN) & MASK)
+    return key
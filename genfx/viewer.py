@@ -0,0 +1,188 @@
+import numpy as np
+
+from genfx import mesh
+from genfx.lod import THRESHOLD
+from genfx.scheduler import Scheduler, MAX_STEPS
+from genfx.simulation import TARGET_FPS
+
+# Interactive pyglet viewer
+#   pyglet (and with it GL) is only imported once a window is actually opened,
+#   so the rest of genfx can be used on machines without a display
+
+#-main-loop-----------------------------------------------------------------------
+# Open a window and run 'sim' (a genfx.simulation.Simulation, or None to only
+# show the sphere) at 'fps' frames per second
+#   the simulation is driven by a genfx.scheduler.Scheduler in fixed steps of
+#   sim.dt, so its output never depends on how fast frames are drawn; 'sim'
+#   may also be a genfx.recording.Replay, whose frames go to the GPU as mapped
+#   (the window closes after its last frame unless the Replay loops)
+#   camera      - genfx.camera.Camera, or None for pyglet's pixel projection
+#   sphere      - radius of the translucent planet to draw (None for no planet)
+#   sphereAlpha - opacity of the planet triangles
+#   vertices    - also draw the planet vertices as points
+#   spin        - degrees the camera turns per frame
+#   samples     - multisampling level (0 for none)
+#   output      - file to record the frames to, see genfx.framewriter
+#                 (e.g. 'angle.y4m' or 'angle/%d.png')
+#   frames      - stop after this many frames (None to run until closed)
+#   headless    - render offscreen through EGL (pyglet.options['headless']);
+#                 with LIBGL_ALWAYS_SOFTWARE=1 this runs on Mesa's software GL
+#   metrics     - file to dump per-frame phase timings to on exit (.csv or
+#                 .jsonl, see genfx.metrics); replaces sim.metrics
+#   verbose     - print one status line per frame
+#   realtime    - keep the simulation in step with the wall clock (catching
+#                 up at most 'maxSteps' steps a frame and dropping the rest);
+#                 otherwise take exactly one step per drawn frame. None means
+#                 realtime unless recording to 'output'
+#   pipelined   - simulate the next frame on a worker thread while this one
+#                 is drawn (see genfx.pipeline); frames show one frame later
+#   cull        - only send the particles inside the view frustum to GL (see
+#                 genfx.cull); the cull ratio goes to the metrics and the
+#                 verbose line
+#   occlude     - with cull, also drop the particles behind the planet
+#   lod         - merge screen cells of lod x lod pixels holding more than
+#                 'lodThreshold' particles into one point each (see
+#                 genfx.lod); None draws every particle. Timed as "cull",
+#                 and 'drawn' in the metrics counts the points sent to GL
+def run(sim, camera=None, fullscreen=False, width=800, height=600, sphere=None, sphereAlpha=0.05,
+        vertices=False, maxDepth=mesh.MAX_DEPTH, spin=0, samples=0, output=None, fps=TARGET_FPS,
+        frames=None, headless=False, metrics=None, verbose=False, realtime=None, maxSteps=MAX_STEPS,
+        pipelined=False, cull=False, occlude=False, lod=None, lodThreshold=THRESHOLD):
+    import pyglet
+    if headless:
+        pyglet.options['headless'] = True
+        fullscreen = False
+    from pyglet import gl
+    from genfx.camera import PixelCamera
+    from genfx.cull import Culler
+    from genfx.framewriter import FrameWriter
+    from genfx.gldraw import ParticleDraw, MeshDraw, pack
+    from genfx.lod import LevelOfDetail
+    from genfx.metrics import FrameMetrics, NO_METRICS
+    from genfx.pipeline import Pipeline
+
+    config = gl.Config(sample_buffers=1, samples=samples) if samples else None
+    if fullscreen:
+        win = pyglet.window.Window(fullscreen=True, config=config)
+    else:
+        win = pyglet.window.Window(width, height, config=config, visible=not headless)
+    width, height = win.width, win.height
+
+    # enable transparency
+    gl.glEnable(gl.GL_BLEND)
+    gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+    planet = MeshDraw(gl, *mesh.sphere(sphere, maxDepth)) if sphere else None
+    particles = ParticleDraw(gl)
+    writer = FrameWriter(output, width, height, fps) if output else None
+    timings = NO_METRICS
+    if metrics and sim is not None:
+        timings = sim.metrics = FrameMetrics()
+    if realtime is None:
+        realtime = output is None
+    scheduler = Scheduler(sim, maxSteps) if sim is not None else None
+    pipeline = Pipeline(sim) if pipelined and sim is not None else None
+    view = camera if camera is not None else PixelCamera(width, height)
+    culler = Culler(view, width/height, sphere if occlude else None) if cull else None
+    reducer = LevelOfDetail(view, width, height, lod, lodThreshold) if lod else None
+    frameNum = 0
+
+    def mainLoop(dt):
+        nonlocal frameNum
+        ended = False
+        win.switch_to()
+        win.clear()
+
+        if camera is not None:
+            gl.glMatrixMode(gl.GL_PROJECTION)
+            gl.glLoadIdentity()
+            gl.gluPerspective(camera.fov, width/height, camera.near, camera.far)
+
+            gl.glMatrixMode(gl.GL_MODELVIEW)
+            gl.glLoadIdentity()
+
+            gl.glTranslatef(*camera.pos)
+            gl.glRotatef(camera.rot_deg, *camera.rot_axis)
+
+        if planet is not None:
+            if vertices:
+                planet.draw((1.0, 1.0, 1.0, 0.8), points=True)
+            planet.draw((1.0, 1.0, 1.0, sphereAlpha))
+
+        if sim is not None:
+            elapsed = dt if realtime else sim.dt
+            if pipeline is not None:
+                # draw the frame the worker just finished while it simulates the next
+                frame = pipeline.swap()
+                steps = scheduler.due(elapsed)
+                pipeline.start(steps)
+                shownFrame, count, systems = frame.frameNum, len(frame), frame.systems
+            else:
+                steps = scheduler.advance(elapsed)
+                shownFrame, count, systems = sim.frameNum, len(sim.positions()), len(sim.systems)
+            # a Replay that has shown its last frame ends the run
+            ended = getattr(sim, "finished", False) and shownFrame >= sim.last
+
+            rows = None
+            if culler is not None or reducer is not None:
+                with timings.time("cull"):
+                    if pipeline is not None:
+                        rows = frame.packed
+                    elif hasattr(sim, "packed"):
+                        rows = sim.packed()
+                    else:
+                        rows = pack(sim.positions(), sim.colors())
+                    if culler is not None:
+                        rows = culler.cull(rows)
+                    if reducer is not None:
+                        rows = reducer.reduce(rows)
+                timings.setDrawn(len(rows))
+
+            # draw pixels
+            with timings.time("draw"):
+                if rows is not None:
+                    particles.uploadPacked(rows)
+                elif pipeline is not None:
+                    particles.uploadPacked(frame.packed)
+                elif hasattr(sim, "packed"):
+                    particles.uploadPacked(sim.packed())
+                else:
+                    particles.upload(sim.positions(), sim.colors())
+                if reducer is not None and reducer.aggregates:
+                    # merged cells go last, as cell sized squares
+                    particles.draw(count=len(rows) - reducer.aggregates)
+                    particles.draw(first=len(rows) - reducer.aggregates, size=reducer.cellSize)
+                else:
+                    particles.draw()
+
+            if verbose:
+                culled = ", %3d%% culled" % round(100*culler.ratio) if culler is not None else ""
+                culled += ", %3d%% merged" % round(100*reducer.ratio) if reducer is not None else ""
+                print( "Frame %3d: %6d particles, %3d systems, %4d ms (%2d FPS), %d steps, %d dropped%s" % (shownFrame, count, systems, 1000*dt, 1/dt, steps, scheduler.dropped, culled) )
+
+        with timings.time("flush"):
+            if writer is not None:
+                # negative pitch gives rows top to bottom
+                data = pyglet.image.get_buffer_manager().get_color_buffer().get_image_data().get_data('RGBA', -4*width)
+                writer.write(np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4))
+            gl.glFlush()
+
+        if camera is not None:
+            camera.rot_deg += spin # after culling, which reads the camera too
+        frameNum += 1
+        if (frames is not None and frameNum >= frames) or ended:
+            pyglet.app.exit()
+
+    pyglet.clock.schedule_interval(mainLoop, 1/fps)
+    try:
+        pyglet.app.run()
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+        if writer is not None:
+            writer.close()
+        if timings.enabled:
+            timings.dump(metrics)
+        if sim is not None and sim.governor is not None:
+            print(sim.governor.summary())
+        win.close()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from genfx import collide, mesh, scenefile
+from genfx.engine import RADIUS
+from genfx.simulation import Simulation
+
+# genfx.collide against the squared-radius sphere rule it stands in for
+
+#-helpers-------------------------------------------------------------------------
+DEPTH = 4
+
+def run(collider, frames=100):
+    sim = Simulation(scenefile.load("genesis"), seed=4, collider=collider)
+    for _ in range(frames):
+        sim.step()
+    return sim.engine.particles
+
+#-tests---------------------------------------------------------------------------
+def test_inside_points_are_hit():
+    collider = collide.sphereCollider(RADIUS, DEPTH)
+    start = [[0, 0, 2*RADIUS], [0, 0, 0.8*RADIUS], [0, 0, 2*RADIUS], [0.5*RADIUS, 0, 0]]
+    end = [[0, 0, 1.5*RADIUS], [0, 0, 0.4*RADIUS], [0, 0, 0.4*RADIUS], [0.6*RADIUS, 0.1, 0]]
+    assert collider.hits(start, end).tolist() == [False, True, True, True]
+
+def test_inside_matches_radius():
+    collider = collide.sphereCollider(RADIUS, DEPTH)
+    points = np.random.default_rng(1).uniform(-2*RADIUS, 2*RADIUS, (20000, 3))
+    r = np.linalg.norm(points, axis=1)
+    inside = collider.inside(points)
+    # the mesh is the sphere cut by flat triangles, so only a thin shell differs
+    assert inside[r < 0.99*RADIUS].all()
+    assert not inside[r > RADIUS].any()
+
+# a sphere mesh kills about the same particles as the sphere of its radius
+def test_sphere_mesh_matches_radius():
+    sphere = run(None)
+    meshed = run(collide.sphereCollider(RADIUS, DEPTH))
+    assert abs(len(meshed) - len(sphere)) <= 0.02*len(sphere)
+    r = np.linalg.norm(meshed.pos[:meshed.count], axis=1)
+    assert (r > 0.99*RADIUS).all()
+
+# no particle survives a step inside a deformed planet, even one spawned there
+def test_displaced_mesh_keeps_nothing_inside():
+    vertices, triangles = mesh.sphere(RADIUS, DEPTH)
+    offsets = np.random.default_rng(2).uniform(-2, 2, len(vertices))
+    collider = collide.MeshCollider(mesh.displace(vertices, offsets), triangles)
+    particles = run(collider)
+    stepped = particles.age[:particles.count] > 0 # not spawned after the last step
+    assert stepped.any()
+    assert not collider.inside(particles.pos[:particles.count][stepped]).any()
@@ -0,0 +1,46 @@
+from genfx.engine import EmitterRegistry, FireworkSystem, ParticleEngine, SurfaceSystem
+
+# genfx.engine.EmitterRegistry: slots, spawners and deaths as systems come and go
+
+#-helpers-------------------------------------------------------------------------
+def engine(lifespans):
+    eng = ParticleEngine(radius=25, rng=1)
+    eng.addSystems(SurfaceSystem.many([[0, 0, 25]]*len(lifespans), (1, 0, 0, 1), (0, 0, 1, 1), lifespans))
+    return eng
+
+def ids(systems):
+    return sorted(sys.id for sys in systems)
+
+#-tests---------------------------------------------------------------------------
+# a removed system's heap entry must not take a live system's slot with it
+def test_remove_then_retire():
+    eng = engine([0.1, 0.2, 5, 5])
+    registry = eng.registry
+    registry.remove(eng.systems[0])
+    for _ in range(6):
+        eng.update(1/24)
+    assert ids(eng.systems) == [2, 3]
+    assert all(registry.slots[sys.slot] is sys for sys in registry)
+    assert [ids(group) for kind, group in registry.spawning()] == [[2, 3]]
+
+# ages come from the clock, and are up to date for the systems that spawn
+def test_ages_follow_the_clock():
+    eng = engine([5])
+    for _ in range(10):
+        eng.update(0.05)
+    late = eng.addSystem(FireworkSystem([0, 30, 0], (1, 1, 1, 1), (1, 0, 0, 1), 0.2))
+    for _ in range(3):
+        eng.update(0.05)
+    first = eng.systems[0]
+    assert abs(first.age - 0.65) < 1e-9 and abs(first.phase - 0.65/5) < 1e-9
+    assert abs(eng.registry.clock - late.born - 0.15) < 1e-9
+    assert [kind for kind, group in eng.registry.spawning()] == [SurfaceSystem] # the burst has gone off
+
+def test_handed_over_systems_keep_their_age():
+    systems = SurfaceSystem.many([[0, 0, 25]]*3, (1, 0, 0, 1), (0, 0, 1, 1), [1, 1, 1])
+    for ii, sys in enumerate(systems):
+        sys.id, sys.age = 2 - ii, 0.5
+    registry = EmitterRegistry(systems, clock=10.0)
+    assert [ids(group) for kind, group in registry.spawning()] == [[0, 1, 2]]
+    assert [sys.id for kind, group in registry.spawning() for sys in group] == [0, 1, 2]
+    assert all(sys.born == 9.5 for sys in systems)
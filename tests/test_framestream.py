@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+from genfx import framestream
+from genfx.gldraw import pack
+from genfx.scenes import SCENES
+from genfx.simulation import Simulation
+
+# genfx.framestream: frames published into shared memory come out unchanged
+
+#-tests---------------------------------------------------------------------------
+def test_publish_subscribe_round_trip():
+    sim = Simulation(SCENES["genesis"](), seed=4)
+    sim.step(60)
+    name = "genfx-test-%d" % os.getpid()
+    publisher = framestream.Publisher(name, sim.dt, sim.scene.radius, slots=2, capacity=len(sim.positions()) + 10)
+    try:
+        with framestream.Subscriber(name) as sub:
+            assert (sub.dt, sub.scene.radius) == (sim.dt, sim.scene.radius)
+            assert not sub.step().finished # nothing published yet
+            publisher.publish(sim)
+            sub.step()
+            assert (sub.frameNum, sub.count) == (sim.frameNum, len(sim.positions()))
+            assert np.array_equal(sub.packed(), pack(sim.positions(), sim.colors()))
+            assert not sub.finished
+            publisher.close()
+            sub.step()
+            assert sub.finished and sub.last == sim.frameNum
+    finally:
+        publisher.close()
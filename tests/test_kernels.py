@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from genfx import kernels
+
+# genfx.kernels against the NumPy engine code, through kernels.check()
+#   the loops run as plain Python here whether or not Numba is installed;
+#   with Numba they are also checked compiled
+
+#-fixtures------------------------------------------------------------------------
+KERNELS = ("advance", "compactRows", "compactValues", "surfaceChildren")
+
+# the kernels as the Python functions they were written as
+@pytest.fixture
+def python(monkeypatch):
+    for name in KERNELS:
+        fn = getattr(kernels, name)
+        monkeypatch.setattr(kernels, name, getattr(fn, "py_func", fn))
+
+#-tests---------------------------------------------------------------------------
+def test_python_kernels_match_numpy(python):
+    diff = kernels.check(n=500, steps=4, systems=20)
+    assert diff["update"] == 0
+    assert diff["spawn"] <= kernels.SPAWN_TOLERANCE
+
+@pytest.mark.skipif(kernels.numba is None, reason="Numba is not installed")
+def test_compiled_kernels_match_numpy():
+    diff = kernels.check()
+    assert diff["update"] == 0
+    assert diff["spawn"] <= kernels.SPAWN_TOLERANCE
+
+# a kernel that is off by one float32 step in one value must fail the check
+def test_check_raises_on_value_mismatch(python, monkeypatch):
+    advance = kernels.advance
+    def skewed(pos, *args):
+        advance(pos, *args)
+        pos[0, 0] = np.nextafter(pos[0, 0], np.float32(np.inf))
+    monkeypatch.setattr(kernels, "advance", skewed)
+    with pytest.raises(AssertionError, match="'pos'"):
+        kernels.check(n=50, steps=1, systems=5)
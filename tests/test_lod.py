@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from genfx import lod
+from genfx.camera import Camera
+from genfx.raster import sphereTriangles
+from genfx.scenes import GenesisScene
+from genfx.simulation import Simulation
+
+# genfx.lod on a seeded genesis frame, seen by the scripts' camera, rendered
+# with the software rasterizer
+
+#-fixtures------------------------------------------------------------------------
+WIDTH, HEIGHT = 640, 480
+FRAME = 300 # crowded enough that every cell size merges a good share
+
+@pytest.fixture(scope="module")
+def frame():
+    sim = Simulation(GenesisScene(), seed=0)
+    sim.step(FRAME)
+    return sim.positions().copy(), sim.colors().copy(), sphereTriangles(sim.scene.radius, 4)
+
+def camera():
+    return Camera([0, 0, -100], 60, (0.0, 1.0, 0.1))
+
+#-tests---------------------------------------------------------------------------
+@pytest.mark.parametrize("cellSize", [1, 2, 4])
+def test_visual_difference_is_small(frame, cellSize):
+    positions, colors, triangles = frame
+    diff = lod.error(positions, colors, camera(), WIDTH, HEIGHT, cellSize, triangles=triangles)
+    assert diff["ratio"] > 0.1 # merging did happen
+    assert diff["mean"] <= lod.MAX_ERROR[0]
+    assert diff["p99"] <= lod.MAX_ERROR[1]
+
+def test_single_pixel_cells_render_identically(frame):
+    positions, colors, triangles = frame
+    diff = lod.error(positions, colors, camera(), WIDTH, HEIGHT, 1, triangles=triangles)
+    assert diff["mean"] == 0 and diff["p99"] == 0
+
+# at most 'threshold' points land in any cell, whatever the particle count
+# (the cell sizes divide the viewport, so no cell is cut by its edge)
+@pytest.mark.parametrize("cellSize", [1, 2, 4])
+def test_points_per_cell_are_bounded(frame, cellSize):
+    positions, colors, _ = frame
+    reducer = lod.LevelOfDetail(camera(), WIDTH, HEIGHT, cellSize, threshold=2)
+    rows = reducer.reduce(np.hstack([positions, colors]))
+    assert len(rows) == reducer.drawn and reducer.aggregates > 0
+    px, py, _, onScreen = reducer.project(rows[:, :3])
+    cells = (py//cellSize)*reducer.cols + px//cellSize
+    assert np.bincount(cells[onScreen]).max() <= 2
+    assert (rows[-reducer.aggregates:, 6] <= 1).all()
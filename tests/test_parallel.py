@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from genfx import scenefile
+from genfx.parallel import PartitionSimulation, ParallelSimulation
+from genfx.scenes import SCENES
+from genfx.simulation import Simulation
+
+# genfx.parallel: the workers together give the particles of one Simulation
+
+#-helpers-------------------------------------------------------------------------
+FRAMES = 120
+
+# (x, y, z, r, g, b, a) rows in one order whatever process made them
+def rows(sim):
+    packed = np.hstack([sim.positions(), sim.colors()])
+    return packed[np.lexsort(packed.T[::-1])]
+
+#-tests---------------------------------------------------------------------------
+@pytest.mark.parametrize("name, scene", [("genesis", SCENES["genesis"]), ("genesis.toml", lambda: scenefile.load("genesis"))])
+def test_parallel_matches_serial(name, scene):
+    serial = Simulation(scene(), seed=4)
+    serial.step(FRAMES)
+    with ParallelSimulation(scene(), seed=4, workers=3) as parallel:
+        parallel.step(FRAMES)
+        assert len(parallel.systems) == len(serial.systems)
+        assert np.array_equal(rows(parallel), rows(serial))
+
+# a partition steps its scene's queue past the events of the other partitions
+def test_partition_does_not_reposition_the_queue(monkeypatch):
+    resets = []
+    reset = scenefile.Timeline.reset
+    monkeypatch.setattr(scenefile.Timeline, "reset", lambda self, event: resets.append(event) or reset(self, event))
+    sim = PartitionSimulation(scenefile.load("genesis"), 1/24, 4, 1, 3)
+    sim.step(FRAMES)
+    sim.engine.particles.release()
+    assert sim.iteration > 3
+    assert resets == [0]
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from genfx import scenefile, snapshot
+from genfx.scenes import SCENES
+from genfx.simulation import Simulation
+
+# genfx.snapshot: a saved and loaded run steps on to the same frames
+
+#-fixtures------------------------------------------------------------------------
+FRAME = 100
+
+def scenes():
+    return [(name, SCENES[name]) for name in sorted(SCENES)] + [("genesis.toml", lambda: scenefile.load("genesis"))]
+
+#-tests---------------------------------------------------------------------------
+@pytest.mark.parametrize("name, scene", scenes())
+def test_round_trip_steps_on_the_same(tmp_path, name, scene):
+    a = Simulation(scene(), seed=4)
+    a.step(FRAME)
+    path = tmp_path / "snapshot.npz"
+    snapshot.save(a, path)
+    b = snapshot.load(path)
+    assert (b.frameNum, b.iteration) == (a.frameNum, a.iteration)
+    assert np.array_equal(b.positions(), a.positions())
+    a.step(50)
+    b.step(50)
+    assert len(b.systems) == len(a.systems)
+    assert np.array_equal(b.positions(), a.positions())
+    assert np.array_equal(b.colors(), a.colors())
+
+def test_version_mismatch_raises(tmp_path, monkeypatch):
+    sim = Simulation(scenefile.load("genesis"), seed=4)
+    sim.step(10)
+    path = tmp_path / "snapshot.npz"
+    snapshot.save(sim, path)
+    monkeypatch.setattr(snapshot, "VERSION", snapshot.VERSION + 1)
+    with pytest.raises(ValueError, match="version"):
+        snapshot.load(path)